@@ -4,20 +4,18 @@ from flask import Flask, render_template
 from flask_bootstrap import Bootstrap5
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from datetime import date, timedelta
-from decimal import Decimal
-from threading import Lock
-from flask_bcrypt import generate_password_hash
 
-db = SQLAlchemy()
+from .database import RoutingSession, init_database
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # create a function that creates a web application
 # a web server will run this web application
-def create_app():
+def create_app(config=None):
   
     app = Flask(__name__)  # this is the name of the module/package that is calling this app
-    # Should be set to false in a production environment
-    app.debug = True
+    # debug mode is off unless configured: FLASK_DEBUG / `flask run --debug`,
+    # CORNERSTONE_DEBUG=true or {'DEBUG': True}; `flask cornerstone serve` always runs without it
     app.secret_key = 'somesecretkey'
 
     instance_dir = os.path.join(app.root_path, 'instance')
@@ -25,8 +23,106 @@ def create_app():
     db_path = os.path.join(instance_dir, 'sitedata.sqlite')
     # set the app configuration data 
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path.replace('\\', '/')
-    # initialise db with flask app
-    db.init_app(app)
+    # booking retries when sqlite reports the database as locked
+    app.config['BOOKING_MAX_RETRIES'] = 5
+    app.config['BOOKING_RETRY_BACKOFF'] = 0.02
+    # listing page sizes (home page, my events, JSON pages)
+    app.config['EVENTS_PER_PAGE'] = 24
+    app.config['MAX_PAGE_SIZE'] = 100
+    app.config['COMMENTS_PER_PAGE'] = 20
+    # shared caches: 'memory' (per worker) or 'file' (CACHE_DIR, shared by workers on a host)
+    app.config['CACHE_BACKEND'] = 'memory'
+    app.config['CACHE_DIR'] = None
+    app.config['FACET_CACHE_TTL'] = 300
+    # rendered event cards and anonymous detail pages (per worker, LRU by size)
+    app.config['FRAGMENT_CACHE_TTL'] = 3600
+    app.config['FRAGMENT_CACHE_MAX_BYTES'] = 8 * 1024 * 1024
+    app.config['PAGE_CACHE_MAX_BYTES'] = 32 * 1024 * 1024
+    # /api/v1: in-process response cache (cleared when events change; other
+    # workers see changes within the TTL) and the Cache-Control max-age for clients
+    app.config['API_CACHE_TTL'] = 10
+    app.config['API_CACHE_MAX_BYTES'] = 16 * 1024 * 1024
+    app.config['API_MAX_AGE'] = 10
+    # logged-in user identity cache
+    app.config['USER_CACHE_TTL'] = 60
+    app.config['USER_CACHE_SIZE'] = 10000
+    # bcrypt cost, and the process pool that computes hashes. Each server process
+    # has its own pool, so these are per process: workers None = the cores shared
+    # out between SERVE_WORKERS processes (one per core outside `serve`), 0 = hash
+    # inline on the request thread; max pending None = 4 per pool worker
+    app.config['BCRYPT_LOG_ROUNDS'] = 12
+    app.config['PASSWORD_HASH_WORKERS'] = None
+    app.config['PASSWORD_HASH_MAX_PENDING'] = None
+    app.config['PASSWORD_HASH_QUEUE_WAIT'] = 2.0
+    # order form idempotency keys: recent ones answered from cache, all kept
+    # IDEMPOTENCY_KEY_DAYS (purge with `flask cornerstone purge-order-keys`)
+    app.config['IDEMPOTENCY_CACHE_TTL'] = 600
+    app.config['IDEMPOTENCY_CACHE_SIZE'] = 10000
+    app.config['IDEMPOTENCY_KEY_DAYS'] = 7
+    # bulk import/export: rows per insert transaction, rows fetched per export chunk
+    app.config['IMPORT_BATCH_SIZE'] = 5000
+    app.config['EXPORT_CHUNK_SIZE'] = 2000
+    # organiser sales: read from the daily rollup table (rebuild with `flask cornerstone rebuild-sales`)
+    app.config['SALES_ROLLUP'] = True
+    app.config['SALES_DAYS'] = 30
+    # waiting room: bookings in flight per event before buyers queue (0 = off);
+    # 'sqlite' shares the queue between worker processes via ADMISSION_DB
+    app.config['ADMISSION_CONCURRENCY'] = 20
+    app.config['ADMISSION_TOKEN_TTL'] = 120
+    app.config['ADMISSION_IDLE_TIMEOUT'] = 30
+    app.config['ADMISSION_POLL_INTERVAL'] = 2
+    app.config['ADMISSION_BACKEND'] = 'memory'
+    app.config['ADMISSION_DB'] = None
+    # static assets: fingerprinted copies from `flask cornerstone build-assets`, used when built
+    app.config['ASSETS_ENABLED'] = True
+    app.config['ASSET_MANIFEST'] = None
+    app.config['ASSET_IMAGE_SIZES'] = {'card': 480, 'detail': 1200}
+    app.config['ASSET_IMAGE_QUALITY'] = 82
+    # background jobs: in-process worker threads (0 = run `flask cornerstone worker` separately)
+    app.config['JOB_WORKERS'] = 0
+    app.config['JOB_POLL_INTERVAL'] = 1.0
+    app.config['JOB_MAX_ATTEMPTS'] = 5
+    app.config['JOB_RETRY_BACKOFF'] = 2.0
+    app.config['JOB_LEASE_SECONDS'] = 60
+    # outgoing mail: 'file' (instance/mail sink), 'memory' or 'smtp'
+    app.config['MAIL_BACKEND'] = 'file'
+    app.config['MAIL_SINK_DIR'] = None
+    app.config['MAIL_SENDER'] = 'tickets@cornerstone.local'
+    app.config['MAIL_SERVER'] = 'localhost'
+    app.config['MAIL_PORT'] = 25
+    # compiled templates cached on disk (default instance/jinja_cache) and loaded
+    # in create_app, so new workers don't compile on their first request
+    app.config['TEMPLATE_BYTECODE_CACHE'] = True
+    app.config['TEMPLATE_CACHE_DIR'] = None
+    app.config['TEMPLATE_WARMUP'] = True
+    # `flask cornerstone serve`: preforked workers (gunicorn if installed, else built in),
+    # each replaced after SERVE_MAX_REQUESTS (+ up to the jitter) requests
+    app.config['SERVE_HOST'] = '127.0.0.1'
+    app.config['SERVE_PORT'] = 8000
+    app.config['SERVE_WORKERS'] = None  # None = one per CPU
+    app.config['SERVE_THREADS'] = 4  # per gunicorn worker; the built-in server uses a thread per connection
+    app.config['SERVE_MAX_REQUESTS'] = 10000
+    app.config['SERVE_MAX_REQUESTS_JITTER'] = 1000
+    app.config['SERVE_GRACEFUL_TIMEOUT'] = 30
+    app.config['SERVE_KEEPALIVE'] = 5
+    app.config['SERVE_ACCESS_LOG'] = False
+    app.config['SERVE_BACKEND'] = 'auto'
+    # seconds between background status sweeps in any process that creates the app
+    # (0 = only at startup, via the CLI / cron, and in `serve` workers, see below)
+    app.config['STATUS_SWEEP_INTERVAL'] = 0
+    # `flask cornerstone serve` workers sweep this often when the above is 0; events
+    # only go Inactive once their date has passed, so a few minutes is plenty
+    app.config['SERVE_STATUS_SWEEP_INTERVAL'] = 300
+    # create tables / seed demo data inside create_app (see also: flask cornerstone init-db)
+    app.config['INIT_DB_ON_STARTUP'] = True
+    app.config['SEED_DEMO_DATA'] = True
+    # CORNERSTONE_* environment variables (values parsed as JSON), then explicit
+    # overrides (benchmarks, alternate deployments) win over the defaults above
+    app.config.from_prefixed_env("CORNERSTONE")
+    if config:
+        app.config.update(config)
+    # initialise db with flask app, tuned by DB_PROFILE ('default' or 'production')
+    init_database(app, db)
     Bootstrap5(app)
     
     # initialise the login manager
@@ -36,19 +132,46 @@ def create_app():
     login_manager.login_view = 'auth.login'
     login_manager.init_app(app)
 
-    # create a user loader function takes userid and returns User
+    # create a user loader function takes userid and returns the user's identity;
+    # served from a short-lived cache so logged-in pages don't query the user table
     # Importing inside the create_app function avoids circular references
     @login_manager.user_loader
     def load_user(user_id):
-       from .models import User
-       return db.session.scalar(db.select(User).where(User.id == user_id))
+       from .identity import load_identity
+       return load_identity(user_id)
 
     from . import views
     app.register_blueprint(views.main_bp)
 
+    from .fragments import render_event_card
+    app.jinja_env.globals['render_event_card'] = render_event_card
+
     from . import auth
     app.register_blueprint(auth.auth_bp)
 
+    from . import bulk
+    app.register_blueprint(bulk.bulk_bp)
+
+    from . import api
+    app.register_blueprint(api.api_bp)
+
+    from . import cli
+    app.cli.add_command(cli.cornerstone_cli)
+
+    from .assets import init_assets
+    init_assets(app)
+
+    # per-request SQL statement budgets (enforced in tests)
+    from .loading import init_query_budget
+    init_query_budget(app)
+
+    # opt-in request/SQL/template timing and the /_perf dashboard
+    from .perf import init_perf
+    init_perf(app)
+
+    from .startup import init_templates
+    init_templates(app)
+
     # error handlers
     @app.errorhandler(404)
     def not_found(e):
@@ -57,105 +180,26 @@ def create_app():
     @app.errorhandler(500)
     def server_error(e):
         return render_template('errors/500.html'), 500
+
+    @app.errorhandler(503)
+    def overloaded(e):
+        return render_template('errors/503.html'), 503, {'Retry-After': '5'}
     
-    app.config.setdefault("INIT_DONE", False)
-    _init_lock = Lock()
-
-    def _ensure_seeded_once():
-        
-        with _init_lock:
-            if app.config["INIT_DONE"]:
-                return
-            from .models import User, Event
-            db.create_all()
-
-            any_event = db.session.scalar(db.select(Event).limit(1))
-            if not any_event:
-                # seed demo user
-                demo = db.session.scalar(db.select(User).where(User.email == "demo@example.com"))
-                if not demo:
-                    demo = User(
-                        name="demo",
-                        first_name="Demo",
-                        last_name="User",
-                        email="demo@example.com",
-                        password_hash=generate_password_hash("password").decode("utf-8"),
-                    )
-                    db.session.add(demo)
-                    db.session.commit()
-
-                today = date.today()
-
-                def add_event_if_missing(title, **kwargs):
-                    exists = db.session.scalar(db.select(Event).where(Event.title == title))
-                    if exists:
-                        return
-                    e = Event(owner_id=demo.id, title=title, **kwargs)
-                    db.session.add(e)
-                    db.session.commit()
-
-                add_event_if_missing(
-                    "Underground Rap Night",
-                    description="A night for upcoming artists to go head-to-head. Doors 6:30pm.",
-                    image_url="img/1.jpg",
-                    category="Rap",
-                    venue="Central Music Park",
-                    artist="Various",
-                    date=today + timedelta(days=7),
-                    capacity=120,
-                    price=Decimal("29.99"),
-                )
-                add_event_if_missing(
-                    "Vibin at the Loft",
-                    description="Smooth grooves and late-night jazz standards.",
-                    image_url="img/2.jpg",
-                    category="Jazz",
-                    venue="The Loft",
-                    artist="Vibin",
-                    date=today + timedelta(days=12),
-                    capacity=80,
-                    price=Decimal("24.50"),
-                )
-                add_event_if_missing(
-                    "Funky Town",
-                    description="Get down with classic soul and funk.",
-                    image_url="img/3.jpg",
-                    category="Soul",
-                    venue="Colters",
-                    artist="Funky Town",
-                    date=today + timedelta(days=18),
-                    capacity=200,
-                    price=Decimal("35.00"),
-                )
-                add_event_if_missing(
-                    "Rhythm & Blues",
-                    description="R&B showcase with guest vocalists.",
-                    image_url="img/4.jpg",
-                    category="RnB",
-                    venue="The Loft",
-                    artist="Various",
-                    date=today + timedelta(days=22),
-                    capacity=150,
-                    price=Decimal("27.00"),
-                )
-                add_event_if_missing(
-                    "Rap Festival",
-                    description="Multi-stage hip-hop festival all day.",
-                    image_url="img/5.jpg",
-                    category="Rap",
-                    venue="Central Music Park",
-                    artist="Several",
-                    date=today + timedelta(days=30),
-                    capacity=500,
-                    price=Decimal("59.90"),
-                )
-
-            app.config["INIT_DONE"] = True
-
-    @app.before_request
-    def _init_guard():
-        # Lightweight check before each request; runs seeding once
-        if not app.config["INIT_DONE"]:
-            _ensure_seeded_once()
+    # schema + demo data are set up once here, before any request (and before
+    # a preforking server forks), instead of lazily on the first request
+    if app.config['INIT_DB_ON_STARTUP']:
+        from .seed import init_db, seed_demo_data
+        from .lifecycle import sweep_statuses
+        with app.app_context():
+            init_db()
+            if app.config['SEED_DEMO_DATA']:
+                seed_demo_data()
+            sweep_statuses()
+
+    # status sweeper / job worker threads; `flask cornerstone serve` stops them
+    # before forking and starts them again in each worker
+    if app.config['STATUS_SWEEP_INTERVAL'] or app.config['JOB_WORKERS']:
+        from .serving import start_background
+        start_background(app)
     
     return app
\ No newline at end of file
@@ -0,0 +1,205 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from flask import current_app
+
+
+class Admission(NamedTuple):
+    token: Optional[str]   # set once admitted: present it with the order form
+    position: int          # 1-based place in the queue, 0 when admitted
+    waiting: int           # buyers queued for this event
+
+    @property
+    def admitted(self) -> bool:
+        return self.token is not None
+
+
+class MemoryRoom:
+    """In-process waiting rooms, one FIFO per event.
+
+    At most `concurrency` buyers per event hold an admission token at a time; a
+    token is released when its booking finishes or after token_ttl seconds. Queued
+    buyers who stop polling for idle_timeout seconds lose their place.
+    """
+
+    def __init__(self, concurrency: int, token_ttl: float, idle_timeout: float):
+        self.concurrency = concurrency
+        self.token_ttl = token_ttl
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._next_ticket = 0
+        # event_id -> OrderedDict(user_id -> [ticket, last_seen])
+        self._waiting = {}
+        # event_id -> {token: (user_id, expires)}
+        self._active = {}
+
+    def _advance(self, waiting, active, now):
+        for token in [t for t, (_, expires) in active.items() if expires <= now]:
+            del active[token]
+        while waiting and len(active) < self.concurrency:
+            user_id, (_, last_seen) = waiting.popitem(last=False)
+            if now - last_seen <= self.idle_timeout:
+                active[secrets.token_urlsafe(16)] = (user_id, now + self.token_ttl)
+
+    def enter(self, event_id: int, user_id: int) -> Admission:
+        """Join (or re-poll) the queue for event_id; admits the user if a slot is free."""
+        now = time.monotonic()
+        with self._lock:
+            waiting = self._waiting.setdefault(event_id, OrderedDict())
+            active = self._active.setdefault(event_id, {})
+            if user_id in waiting:
+                waiting[user_id][1] = now
+            # an expired token doesn't count: _advance drops it and the user queues again
+            elif not any(uid == user_id and expires > now for uid, expires in active.values()):
+                self._next_ticket += 1
+                waiting[user_id] = [self._next_ticket, now]
+            self._advance(waiting, active, now)
+            for token, (uid, _) in active.items():
+                if uid == user_id:
+                    return Admission(token, 0, len(waiting))
+            head = next(iter(waiting.values()))[0]
+            return Admission(None, waiting[user_id][0] - head + 1, len(waiting))
+
+    def check(self, event_id: int, user_id: int, token: str) -> bool:
+        with self._lock:
+            held = self._active.get(event_id, {}).get(token)
+            return held is not None and held[0] == user_id and held[1] > time.monotonic()
+
+    def release(self, event_id: int, token: str):
+        with self._lock:
+            self._active.get(event_id, {}).pop(token, None)
+            self._advance(self._waiting.get(event_id, OrderedDict()), self._active.get(event_id, {}),
+                          time.monotonic())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {event_id: {"waiting": len(self._waiting.get(event_id, ())), "admitted": len(active)}
+                    for event_id, active in self._active.items()}
+
+
+class SqliteRoom:
+    """Same rules as MemoryRoom, kept in a small sqlite file so every worker
+    process on the host shares one queue per event. Separate from the main
+    database so queue traffic never waits on booking writes."""
+
+    def __init__(self, path: str, concurrency: int, token_ttl: float, idle_timeout: float):
+        self.path = path
+        self.concurrency = concurrency
+        self.token_ttl = token_ttl
+        self.idle_timeout = idle_timeout
+        self._local = threading.local()
+        self._connect().conn.executescript("""
+            CREATE TABLE IF NOT EXISTS waiting (
+                ticket INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id INTEGER NOT NULL, user_id INTEGER NOT NULL, last_seen REAL NOT NULL,
+                UNIQUE (event_id, user_id));
+            CREATE TABLE IF NOT EXISTS active (
+                token TEXT PRIMARY KEY,
+                event_id INTEGER NOT NULL, user_id INTEGER NOT NULL, expires REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS ix_active_event ON active (event_id, user_id);
+        """)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return _Immediate(conn)
+
+    def _advance(self, conn, event_id, now):
+        conn.execute("DELETE FROM active WHERE event_id = ? AND expires <= ?", (event_id, now))
+        free = self.concurrency - conn.execute(
+            "SELECT count(*) FROM active WHERE event_id = ?", (event_id,)).fetchone()[0]
+        while free > 0:
+            rows = conn.execute(
+                "SELECT ticket, user_id, last_seen FROM waiting WHERE event_id = ? ORDER BY ticket LIMIT ?",
+                (event_id, free)).fetchall()
+            if not rows:
+                break
+            conn.execute(f"DELETE FROM waiting WHERE ticket IN ({','.join('?' * len(rows))})",
+                         [ticket for ticket, _, _ in rows])
+            for _, user_id, last_seen in rows:
+                if time.time() - last_seen <= self.idle_timeout:
+                    conn.execute("INSERT INTO active VALUES (?, ?, ?, ?)",
+                                 (secrets.token_urlsafe(16), event_id, user_id, now + self.token_ttl))
+                    free -= 1
+
+    def enter(self, event_id: int, user_id: int) -> Admission:
+        now = time.time()
+        with self._connect() as conn:
+            if not conn.execute("SELECT 1 FROM active WHERE event_id = ? AND user_id = ? AND expires > ?",
+                                (event_id, user_id, now)).fetchone():
+                conn.execute(
+                    "INSERT INTO waiting (event_id, user_id, last_seen) VALUES (?, ?, ?) "
+                    "ON CONFLICT (event_id, user_id) DO UPDATE SET last_seen = excluded.last_seen",
+                    (event_id, user_id, now))
+            self._advance(conn, event_id, now)
+            waiting = conn.execute("SELECT count(*) FROM waiting WHERE event_id = ?", (event_id,)).fetchone()[0]
+            row = conn.execute("SELECT token FROM active WHERE event_id = ? AND user_id = ?",
+                               (event_id, user_id)).fetchone()
+            if row:
+                return Admission(row[0], 0, waiting)
+            position = conn.execute(
+                "SELECT count(*) FROM waiting WHERE event_id = ? AND ticket <= "
+                "(SELECT ticket FROM waiting WHERE event_id = ? AND user_id = ?)",
+                (event_id, event_id, user_id)).fetchone()[0]
+            return Admission(None, position, waiting)
+
+    def check(self, event_id: int, user_id: int, token: str) -> bool:
+        row = self._connect().conn.execute(
+            "SELECT 1 FROM active WHERE token = ? AND event_id = ? AND user_id = ? AND expires > ?",
+            (token, event_id, user_id, time.time())).fetchone()
+        return row is not None
+
+    def release(self, event_id: int, token: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM active WHERE token = ?", (token,))
+            self._advance(conn, event_id, time.time())
+
+    def stats(self) -> dict:
+        conn = self._connect().conn
+        stats = {}
+        for event_id, count in conn.execute("SELECT event_id, count(*) FROM waiting GROUP BY event_id"):
+            stats.setdefault(event_id, {"waiting": 0, "admitted": 0})["waiting"] = count
+        for event_id, count in conn.execute("SELECT event_id, count(*) FROM active GROUP BY event_id"):
+            stats.setdefault(event_id, {"waiting": 0, "admitted": 0})["admitted"] = count
+        return stats
+
+
+class _Immediate:
+    """`with` block running as one BEGIN IMMEDIATE transaction."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def waiting_room():
+    """The app's admission controller, or None when ADMISSION_CONCURRENCY is 0."""
+    config = current_app.config
+    if not config["ADMISSION_CONCURRENCY"]:
+        return None
+    room = current_app.extensions.get("cornerstone_admission")
+    if room is None:
+        args = (config["ADMISSION_CONCURRENCY"], config["ADMISSION_TOKEN_TTL"], config["ADMISSION_IDLE_TIMEOUT"])
+        if config["ADMISSION_BACKEND"] == "sqlite":
+            path = config["ADMISSION_DB"] or os.path.join(current_app.instance_path, "admission.sqlite")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            room = SqliteRoom(path, *args)
+        else:
+            room = MemoryRoom(*args)
+        room = current_app.extensions.setdefault("cornerstone_admission", room)
+    return room
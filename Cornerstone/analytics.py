@@ -0,0 +1,140 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from flask import current_app
+from sqlalchemy import func
+
+from .database import dialect_insert
+from .models import Event, Order, SalesDaily
+from . import db
+
+
+class EventSales(NamedTuple):
+    event_id: int
+    title: str
+    date: date
+    capacity: int
+    orders: int
+    tickets: int
+    revenue: Decimal
+
+    @property
+    def sell_through(self) -> Optional[float]:
+        """Fraction of capacity sold, None for unlimited events."""
+        return self.tickets / self.capacity if self.capacity else None
+
+
+class DaySales(NamedTuple):
+    day: date
+    orders: int
+    tickets: int
+    revenue: Decimal
+
+
+def _use_rollup() -> bool:
+    return current_app.config["SALES_ROLLUP"]
+
+
+def _day(value) -> date:
+    # sqlite's date() hands back text
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _money(value) -> Decimal:
+    return Decimal(value or 0).quantize(Decimal("0.01"))
+
+
+def event_sales(owner_id: int) -> list:
+    """Orders, tickets and revenue per event for one organiser, newest event first."""
+    if _use_rollup():
+        sales = (
+            db.select(
+                SalesDaily.event_id,
+                func.sum(SalesDaily.orders).label("orders"),
+                func.sum(SalesDaily.tickets).label("tickets"),
+                func.sum(SalesDaily.revenue).label("revenue"),
+            )
+            .join(Event, Event.id == SalesDaily.event_id)
+            .where(Event.owner_id == owner_id)
+            .group_by(SalesDaily.event_id)
+        )
+    else:
+        sales = (
+            db.select(
+                Order.event_id,
+                func.count(Order.id).label("orders"),
+                func.sum(Order.qty).label("tickets"),
+                func.sum(Order.qty * Order.price).label("revenue"),
+            )
+            .join(Event, Event.id == Order.event_id)
+            .where(Event.owner_id == owner_id)
+            .group_by(Order.event_id)
+        )
+    sales = sales.subquery()
+    rows = db.session.execute(
+        db.select(Event.id, Event.title, Event.date, Event.capacity,
+                  sales.c.orders, sales.c.tickets, sales.c.revenue)
+        .outerjoin(sales, sales.c.event_id == Event.id)
+        .where(Event.owner_id == owner_id)
+        .order_by(Event.date.desc(), Event.id.desc())
+    ).all()
+    return [
+        EventSales(event_id, title, event_date, capacity or 0, orders or 0, tickets or 0, _money(revenue))
+        for event_id, title, event_date, capacity, orders, tickets, revenue in rows
+    ]
+
+
+def daily_sales(owner_id: int, days: int = None) -> list:
+    """Orders, tickets and revenue per day across an organiser's events, oldest day first."""
+    days = days or current_app.config["SALES_DAYS"]
+    since = date.today() - timedelta(days=days - 1)
+    if _use_rollup():
+        day = SalesDaily.day
+        stmt = (
+            db.select(day, func.sum(SalesDaily.orders), func.sum(SalesDaily.tickets), func.sum(SalesDaily.revenue))
+            .join(Event, Event.id == SalesDaily.event_id)
+            .where(Event.owner_id == owner_id, SalesDaily.day >= since)
+        )
+    else:
+        day = func.date(Order.created_at)
+        stmt = (
+            db.select(day, func.count(Order.id), func.sum(Order.qty), func.sum(Order.qty * Order.price))
+            .join(Event, Event.id == Order.event_id)
+            .where(Event.owner_id == owner_id, Order.created_at >= since)
+        )
+    rows = db.session.execute(stmt.group_by(day).order_by(day)).all()
+    return [DaySales(_day(d), orders or 0, tickets or 0, _money(revenue)) for d, orders, tickets, revenue in rows]
+
+
+def record_sale(order: Order):
+    """Fold an order into the daily rollup, in the caller's transaction."""
+    if not _use_rollup():
+        return
+    revenue = Decimal(order.price) * order.qty
+    stmt = dialect_insert(db.session, SalesDaily).values(
+        event_id=order.event_id, day=order.created_at.date(), orders=1, tickets=order.qty, revenue=revenue,
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[SalesDaily.event_id, SalesDaily.day],
+        set_={
+            "orders": SalesDaily.orders + 1,
+            "tickets": SalesDaily.tickets + order.qty,
+            "revenue": SalesDaily.revenue + revenue,
+        },
+    ))
+
+
+def rebuild_sales_rollup() -> int:
+    """Recompute the daily rollup from the order table; returns the rows written."""
+    db.session.execute(db.delete(SalesDaily))
+    day = func.date(Order.created_at)
+    db.session.execute(
+        db.insert(SalesDaily).from_select(
+            ["event_id", "day", "orders", "tickets", "revenue"],
+            db.select(Order.event_id, day, func.count(Order.id), func.sum(Order.qty), func.sum(Order.qty * Order.price))
+            .group_by(Order.event_id, day),
+        )
+    )
+    db.session.commit()
+    return db.session.scalar(db.select(func.count()).select_from(SalesDaily))
@@ -0,0 +1,128 @@
+import hashlib
+import json
+from datetime import date
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, url_for
+from werkzeug.exceptions import HTTPException
+
+from .cache import get_cache
+from .models import Event, STATUSES
+from .pagination import keyset_page, page_size
+from .signals import event_changed
+from . import db
+
+api_bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+# selected as plain columns: rows come back as tuples, no Event instances are built
+COLUMNS = (Event.id, Event.title, Event.artist, Event.venue, Event.category, Event.image_url,
+           Event.date, Event.price, Event.lifecycle, Event.capacity, Event.tickets_sold)
+FIELDS = ("id", "title", "artist", "venue", "category", "image_url",
+          "date", "price", "status", "capacity", "tickets_sold")
+
+
+def serialise_event(row) -> dict:
+    item = dict(zip(FIELDS, row))
+    item["date"] = item["date"].isoformat()
+    item["price"] = str(item["price"])
+    item["tickets_left"] = max(item["capacity"] - item["tickets_sold"], 0) if item["capacity"] else None
+    item["url"] = url_for("main.event_detail", event_id=item["id"])
+    return item
+
+
+def _response_cache():
+    return get_cache("api_responses", maxsize=10_000, ttl=current_app.config["API_CACHE_TTL"],
+                     shared=False, max_bytes=current_app.config["API_CACHE_MAX_BYTES"])
+
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        abort(400, f"{name} must be a YYYY-MM-DD date")
+
+
+def _json(payload) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def cached_json(build):
+    """Serve GET bodies from the response cache, keyed on path and query string.
+
+    build() makes the payload on a miss. Responses carry a content ETag and
+    Cache-Control, and If-None-Match gets a 304 without rebuilding anything.
+    """
+    key = (request.path, request.query_string)
+    cache = _response_cache()
+    hit = cache.get(key)
+    if hit is None:
+        body = _json(build())
+        hit = (hashlib.blake2b(body, digest_size=12).hexdigest(), body)
+        cache.set(key, hit)
+    etag, body = hit
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["API_MAX_AGE"]
+    return response.make_conditional(request)
+
+
+@api_bp.route("/events")
+def events():
+    """Events by date; filters: category, status, date_from, date_to (inclusive).
+
+    Keyset paging with limit / after / before, like the HTML listing.
+    """
+    def build():
+        stmt = db.select(*COLUMNS)
+        category = request.args.get("category")
+        if category:
+            stmt = stmt.where(Event.category == category)
+        status = request.args.get("status")
+        if status:
+            if status not in STATUSES:
+                abort(400, f"status must be one of {', '.join(STATUSES)}")
+            stmt = stmt.where(Event.lifecycle == status)
+        date_from, date_to = _date_arg("date_from"), _date_arg("date_to")
+        if date_from:
+            stmt = stmt.where(Event.date >= date_from)
+        if date_to:
+            stmt = stmt.where(Event.date <= date_to)
+        size = page_size(request.args.get("limit"), current_app.config["EVENTS_PER_PAGE"],
+                         current_app.config["MAX_PAGE_SIZE"])
+        page = keyset_page(stmt, [Event.date, Event.id], size, after=request.args.get("after"),
+                           before=request.args.get("before"), width=len(COLUMNS))
+        return {"events": [serialise_event(row) for row in page.items],
+                "next": page.next_cursor, "prev": page.prev_cursor}
+    return cached_json(build)
+
+
+@api_bp.route("/events/<int:event_id>")
+def event(event_id):
+    def build():
+        row = db.session.execute(
+            db.select(*COLUMNS, Event.description).where(Event.id == event_id)).first()
+        if row is None:
+            abort(404)
+        return dict(serialise_event(row), description=row.description)
+    return cached_json(build)
+
+
+def api_error(e: HTTPException):
+    return jsonify(error=e.name, message=e.description), e.code
+
+
+# by status code, so they win over the app's HTML error pages for the same codes
+for _code in (400, 404, 500):
+    api_bp.register_error_handler(_code, api_error)
+
+
+def _invalidate(app, event_id=None, **extra):
+    # any change can move an event in or out of any filtered list, so drop them all;
+    # other worker processes catch up within API_CACHE_TTL
+    _response_cache().clear()
+
+
+event_changed.connect(_invalidate)
@@ -0,0 +1,213 @@
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import current_app, request, send_from_directory, url_for
+
+BUILD_DIR = "build"
+MANIFEST = "manifest.json"
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+IMAGES = {".jpg", ".jpeg", ".png"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def _optional(module: str):
+    """Import an optional build dependency, or None when it isn't installed."""
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        return None
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _write(out_root, logical, suffix, data):
+    """Write data as <name>.<hash>[.variant]<ext>; returns its path relative to the build dir."""
+    stem, ext = os.path.splitext(logical)
+    name = f"{stem}{suffix}.{_digest(data)}{ext}"
+    path = os.path.join(out_root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return name.replace(os.sep, "/")
+
+
+def _precompress(out_root, name, data, stats, brotli):
+    path = os.path.join(out_root, name)
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    stats["gzip"] += 1
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+        stats["brotli"] += 1
+
+
+def _image_variants(Image, out_root, logical, source_path, original_file, sizes, quality, stats):
+    """Resized copies per ASSET_IMAGE_SIZES label, plus a WebP of each.
+
+    A resized copy that would not be smaller (image already narrow enough, or the
+    re-encode came out bigger) points at the original file; a WebP that isn't
+    smaller than its JPEG/PNG is left out.
+    """
+    stem, ext = os.path.splitext(logical)
+    variants = {}
+
+    def add_webp(key, image, suffix, compare_size):
+        data = _encode(image, ".webp", quality)
+        if len(data) < compare_size:
+            variants[key] = _write(out_root, stem + ".webp", suffix, data)
+            stats["webp"] += 1
+
+    original_size = os.path.getsize(source_path)
+    with Image.open(source_path) as original:
+        original.load()
+        add_webp("webp", original, "", original_size)
+        for label, width in sorted(sizes.items(), key=lambda kv: kv[1]):
+            if original.width <= width:
+                variants[label] = original_file
+                if "webp" in variants:
+                    variants[f"{label}.webp"] = variants["webp"]
+                continue
+            image = original.resize((width, round(original.height * width / original.width)), Image.LANCZOS)
+            data = _encode(image, ext.lower(), quality)
+            if len(data) < original_size:
+                variants[label] = _write(out_root, logical, f".{label}", data)
+                stats["resized"] += 1
+            else:
+                variants[label] = original_file
+            add_webp(f"{label}.webp", image, f".{label}", min(len(data), original_size))
+    return variants
+
+
+def _encode(image, ext, quality) -> bytes:
+    buf = io.BytesIO()
+    if ext == ".webp":
+        image.save(buf, "WEBP", quality=quality, method=6)
+    elif ext in (".jpg", ".jpeg"):
+        image.convert("RGB").save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def _rewrite_css_urls(css: bytes, logical: str, manifest: dict) -> bytes:
+    """Point url(...) references at the fingerprinted copies, so the CSS hash covers them too."""
+    base = posixpath.dirname(logical)
+
+    def replace(match):
+        quote, ref = match.groups()
+        target = posixpath.normpath(posixpath.join(base, ref))
+        if ref.startswith(("data:", "http:", "https:", "/")) or target not in manifest:
+            return match.group(0)
+        return f"url({quote}{posixpath.relpath(manifest[target]['file'], base)}{quote})"
+
+    return CSS_URL.sub(replace, css.decode("utf-8")).encode("utf-8")
+
+
+def build_assets(static_folder: str, sizes: dict, quality: int = 82) -> dict:
+    """Fingerprint every file under static_folder into static/build and write the manifest.
+
+    Returns counts of what was produced. Rebuilding replaces the whole build dir.
+    Pillow and brotli are optional and only imported here, not at app startup:
+    without them the build skips resized/WebP images and .br files.
+    """
+    Image, brotli = _optional("PIL.Image"), _optional("brotli")
+    out_root = os.path.join(static_folder, BUILD_DIR)
+    shutil.rmtree(out_root, ignore_errors=True)
+    sources = []
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        dirnames[:] = [d for d in dirnames if os.path.join(dirpath, d) != out_root]
+        for filename in filenames:
+            source = os.path.join(dirpath, filename)
+            sources.append((os.path.relpath(source, static_folder).replace(os.sep, "/"), source))
+    # stylesheets last, once everything they might reference has its hashed name
+    sources.sort(key=lambda item: (item[0].endswith(".css"), item[0]))
+
+    manifest = {}
+    stats = {"files": 0, "gzip": 0, "brotli": 0, "resized": 0, "webp": 0}
+    for logical, source in sources:
+        with open(source, "rb") as f:
+            data = f.read()
+        ext = os.path.splitext(logical)[1].lower()
+        if ext == ".css":
+            data = _rewrite_css_urls(data, logical, manifest)
+        entry = {"file": _write(out_root, logical, "", data)}
+        stats["files"] += 1
+        if ext in COMPRESSIBLE:
+            _precompress(out_root, entry["file"], data, stats, brotli)
+        if ext in IMAGES and Image is not None:
+            entry["variants"] = _image_variants(Image, out_root, logical, source, entry["file"], sizes, quality, stats)
+        manifest[logical] = entry
+    with open(os.path.join(out_root, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    stats["pillow"] = Image is not None
+    stats["brotli_available"] = brotli is not None
+    return stats
+
+
+def _manifest() -> dict:
+    return current_app.extensions.get("cornerstone_assets", {})
+
+
+def asset_url_for(endpoint, **values):
+    """url_for for templates: static files resolve to their fingerprinted build copy.
+
+    size='card' (or any ASSET_IMAGE_SIZES key) picks a resized variant, webp=True
+    its WebP version. Without a manifest it falls back to the plain static URL.
+    """
+    if endpoint != "static":
+        return url_for(endpoint, **values)
+    size = values.pop("size", None)
+    webp = values.pop("webp", False)
+    entry = _manifest().get(values.get("filename", "").lstrip("/"))
+    if entry is None:
+        return None if webp else url_for(endpoint, **values)
+    variants = entry.get("variants", {})
+    if webp:
+        name = variants.get(f"{size}.webp" if size else "webp")
+        if name is None:
+            return None
+    else:
+        name = variants.get(size, entry["file"]) if size else entry["file"]
+    values["filename"] = f"{BUILD_DIR}/{name}"
+    return url_for(endpoint, **values)
+
+
+def serve_static(filename):
+    """Static view: fingerprinted build files get immutable caching and precompressed bodies."""
+    if not filename.startswith(BUILD_DIR + "/"):
+        return current_app.send_static_file(filename)
+    folder = current_app.static_folder
+    accepted = request.accept_encodings
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if accepted[encoding] and os.path.isfile(os.path.join(folder, filename + suffix)):
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            response = send_from_directory(folder, filename + suffix, mimetype=mimetype, max_age=31536000)
+            response.headers["Content-Encoding"] = encoding
+            break
+    else:
+        response = send_from_directory(folder, filename, max_age=31536000)
+    response.headers["Cache-Control"] = IMMUTABLE
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_assets(app):
+    """Load the manifest once and route static URLs/requests through it."""
+    path = app.config["ASSET_MANIFEST"] or os.path.join(app.static_folder, BUILD_DIR, MANIFEST)
+    if app.config["ASSETS_ENABLED"] and os.path.exists(path):
+        with open(path) as f:
+            app.extensions["cornerstone_assets"] = json.load(f)
+    app.jinja_env.globals["url_for"] = asset_url_for
+    app.view_functions["static"] = serve_static
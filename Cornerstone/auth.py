@@ -1,8 +1,8 @@
-from flask import Blueprint, flash, render_template, request, url_for, redirect
-from flask_bcrypt import generate_password_hash, check_password_hash
+from flask import Blueprint, flash, render_template, request, url_for, redirect, abort
 from flask_login import login_user, login_required, logout_user
 from .models import User
 from .forms import LoginForm, RegisterForm
+from .passwords import hash_password, check_password, needs_rehash, HashingOverloaded
 from . import db
 
 # Create a blueprint - make sure all BPs have unique names
@@ -19,10 +19,22 @@ def login():
         password = login_form.password.data
 
         user = db.session.scalar(db.select(User).where(User.name==user_name))
-        if user is None:
-            error = 'Incorrect user name'
-        elif not check_password_hash(user.password_hash, password): # takes the hash and cleartext password
-            error = 'Incorrect password'
+        try:
+            if user is None:
+                error = 'Incorrect user name'
+            elif not check_password(user.password_hash, password): # takes the hash and cleartext password
+                error = 'Incorrect password'
+        except HashingOverloaded:
+            abort(503)
+
+        if error is None and needs_rehash(user.password_hash):
+            # BCRYPT_LOG_ROUNDS changed since this hash was made; the password is
+            # already verified, so under load just try again on a later login
+            try:
+                user.password_hash = hash_password(password)
+                db.session.commit()
+            except HashingOverloaded:
+                pass
 
         if error is None:
             login_user(user)
@@ -60,8 +72,11 @@ def register():
             email=form.email.data.strip(),
             phone=(form.phone.data.strip() if form.phone.data else None),
             street_address=(form.street_address.data.strip() if form.street_address.data else None),
-            password_hash=generate_password_hash(form.password.data).decode('utf-8')
         )
+        try:
+            user.password_hash = hash_password(form.password.data)
+        except HashingOverloaded:
+            abort(503)
         db.session.add(user)
         db.session.commit()
         flash("Registration successful. You can now log in.")
@@ -0,0 +1,119 @@
+import random
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from flask import current_app
+from sqlalchemy import and_, case, or_
+from sqlalchemy.exc import OperationalError
+
+from .analytics import record_sale
+from .idempotency import claim_key, remember, replayed_order
+from .models import Event, Order, make_order_id
+from .notifications import enqueue_booking_jobs
+from .signals import notify_event_changed
+from . import db
+
+# reservation outcomes
+BOOKED = "booked"
+SOLD_OUT = "sold_out"
+CLOSED = "closed"
+CONTENDED = "contended"
+# the form was already submitted; order is the booking that submission made
+REPLAYED = "replayed"
+
+
+class BookingResult(NamedTuple):
+    status: str
+    order: Optional[Order] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == BOOKED
+
+
+def _is_locked(err: OperationalError) -> bool:
+    msg = str(err.orig).lower()
+    return "database is locked" in msg or "database table is locked" in msg or "busy" in msg
+
+
+def _reserve_once(event_id: int, user_id: int, qty: int, key: Optional[str]) -> BookingResult:
+    order_id = make_order_id(event_id)
+    # claim the form's key first: a duplicate submission stops here, before the event row
+    if key and not claim_key(key, user_id, event_id, order_id):
+        db.session.rollback()
+        return BookingResult(REPLAYED, replayed_order(user_id, key))
+
+    # capacity check and increment in a single statement, so two buyers
+    # can never both pass the check. capacity == 0 means unlimited.
+    stmt = (
+        db.update(Event)
+        .where(
+            Event.id == event_id,
+            Event.cancelled.is_(False),
+            Event.date >= date.today(),
+            or_(Event.capacity == 0, Event.tickets_sold + qty <= Event.capacity),
+        )
+        .values(
+            tickets_sold=Event.tickets_sold + qty,
+            # SET sees the pre-update row, so this is "sold out after this booking"
+            lifecycle=case(
+                (and_(Event.capacity != 0, Event.tickets_sold + qty >= Event.capacity), "Sold Out"),
+                else_=Event.lifecycle,
+            ),
+            version=Event.version + 1,
+            updated_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if db.session.execute(stmt).rowcount != 1:
+        db.session.rollback()
+        event = db.session.get(Event, event_id)
+        if event is None or event.cancelled or event.date < date.today():
+            return BookingResult(CLOSED)
+        return BookingResult(SOLD_OUT)
+
+    # the row is now write-locked by this transaction, so the price can't change under us
+    price = db.session.scalar(db.select(Event.price).where(Event.id == event_id))
+    order = Order(
+        user_id=user_id,
+        event_id=event_id,
+        qty=qty,
+        price=Decimal(price),
+        order_id=order_id,
+        created_at=datetime.utcnow(),
+    )
+    db.session.add(order)
+    record_sale(order)
+    # receipts etc. run on the job workers; queued atomically with the order
+    enqueue_booking_jobs(order)
+    db.session.commit()
+    if key:
+        remember(user_id, key, order)
+    # the UPDATE above bypassed the ORM, so announce the change ourselves
+    notify_event_changed(event_id)
+    return BookingResult(BOOKED, order)
+
+
+def reserve_tickets(event_id: int, user_id: int, qty: int, key: Optional[str] = None) -> BookingResult:
+    """Atomically book qty tickets, retrying with backoff while sqlite is locked.
+
+    With an idempotency key, a repeat of an earlier submission returns REPLAYED
+    and that submission's order instead of booking again.
+    """
+    retries = current_app.config.get("BOOKING_MAX_RETRIES", 5)
+    backoff = current_app.config.get("BOOKING_RETRY_BACKOFF", 0.02)
+
+    for attempt in range(retries + 1):
+        try:
+            return _reserve_once(event_id, user_id, qty, key)
+        except OperationalError as err:
+            db.session.rollback()
+            if not _is_locked(err):
+                raise
+            if attempt == retries:
+                break
+            # exponential backoff with jitter so retrying writers don't collide again
+            time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+    return BookingResult(CONTENDED)
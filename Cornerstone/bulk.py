@@ -0,0 +1,288 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple
+
+from flask import Blueprint, Response, current_app, flash, redirect, render_template, stream_with_context, url_for
+from flask_login import current_user, login_required
+from wtforms import fields as wtf_fields
+from wtforms.fields.core import UnboundField
+from wtforms.validators import StopValidation, ValidationError
+
+from .forms import EventForm, ImportForm
+from .models import Event, Order, event_status
+from .search import index_events_after
+from .signals import notify_event_changed
+from . import db
+
+bulk_bp = Blueprint('bulk', __name__)
+
+FORMATS = ("csv", "jsonl")
+EVENT_EXPORT_FIELDS = ("id", "title", "artist", "description", "date", "venue", "category", "image_url",
+                       "capacity", "tickets_sold", "price", "status", "cancelled")
+ORDER_EXPORT_FIELDS = ("order_id", "event_id", "event_title", "user_id", "qty", "price", "created_at")
+
+
+# Row validation. EventForm is the single source of truth for the rules, but a full
+# wtforms Form per row costs ~80us, too slow for millions of rows. So the form's own
+# field definitions are compiled once: a cheap coercion per field type, then the
+# form's actual validator objects run against a minimal stand-in field.
+
+class _Field:
+    __slots__ = ("data", "raw_data", "errors")
+
+    def __init__(self, raw):
+        self.raw_data = [raw] if raw != "" else []
+        self.data = raw
+        self.errors = []
+
+    @staticmethod
+    def gettext(s):
+        return s
+
+    @staticmethod
+    def ngettext(singular, plural, n):
+        return singular if n == 1 else plural
+
+
+def _coercer(unbound: UnboundField):
+    cls = unbound.field_class
+    if issubclass(cls, wtf_fields.DateField):
+        fmt = unbound.kwargs.get("format", "%Y-%m-%d")
+        fmt = fmt[0] if isinstance(fmt, (list, tuple)) else fmt
+        return lambda v: datetime.strptime(v, fmt).date(), "Not a valid date value."
+    if issubclass(cls, wtf_fields.IntegerField):
+        return int, "Not a valid integer value."
+    if issubclass(cls, wtf_fields.FloatField):
+        return float, "Not a valid float value."
+    if issubclass(cls, wtf_fields.SelectField):
+        choices = {str(c[0]) for c in unbound.kwargs.get("choices", ())}
+
+        def choose(v):
+            if v not in choices:
+                raise ValueError
+            return v
+        return choose, "Not a valid choice."
+    if issubclass(cls, wtf_fields.StringField):
+        return str, None
+    raise TypeError(f"no bulk coercion for {cls.__name__}")
+
+
+def _compile_rules(form_class):
+    rules = []
+    for name in dir(form_class):
+        unbound = getattr(form_class, name)
+        if not isinstance(unbound, UnboundField) or issubclass(unbound.field_class, wtf_fields.SubmitField):
+            continue
+        coerce, message = _coercer(unbound)
+        rules.append((name, coerce, message, tuple(unbound.kwargs.get("validators") or ())))
+    return rules
+
+
+EVENT_RULES = _compile_rules(EventForm)
+
+
+class UnreadableRow(NamedTuple):
+    """A line read_rows couldn't parse; validate_row reports it as that row's error."""
+    message: str
+
+
+def validate_row(row: dict):
+    """(data, errors) for one input row, applying EventForm's rules."""
+    if isinstance(row, UnreadableRow):
+        return {}, {"row": [row.message]}
+    if not isinstance(row, dict):
+        # e.g. a JSONL line holding a list or a bare string
+        return {}, {"row": ["Expected an object with event fields."]}
+    data, errors = {}, {}
+    for name, coerce, message, validators in EVENT_RULES:
+        raw = row.get(name)
+        raw = "" if raw is None else str(raw)
+        field = _Field(raw)
+        if raw != "":
+            try:
+                field.data = coerce(raw)
+            except ValueError:
+                field.data = None
+                field.errors.append(message)
+        else:
+            field.data = None if coerce is not str else ""
+        for validator in validators:
+            try:
+                validator(None, field)
+            except StopValidation as e:
+                if e.args and e.args[0]:
+                    field.errors.append(e.args[0])
+                break
+            except ValidationError as e:
+                field.errors.append(e.args[0])
+        if field.errors:
+            errors[name] = field.errors
+        data[name] = field.data
+    return data, errors
+
+
+def read_rows(stream, fmt: str):
+    """Yield dict rows from a text stream, one at a time."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "jsonl":
+        for line in stream:
+            if line.strip():
+                # one bad line is rejected like an invalid row, not the end of the import
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield UnreadableRow(f"Not valid JSON: {e.msg} (column {e.colno}).")
+    else:
+        raise ValueError(f"unknown format {fmt!r}")
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    rejected: int
+    errors: list
+
+
+def _event_values(data, owner_id):
+    capacity = data["capacity"] or 0
+    return {
+        "owner_id": owner_id,
+        "title": data["title"].strip(),
+        "description": data["description"].strip(),
+        "image_url": data["image_url"].strip() or None,
+        "category": data["category"],
+        "venue": data["venue"].strip(),
+        "artist": data["artist"].strip(),
+        "date": data["date"],
+        "capacity": capacity,
+        "tickets_sold": 0,
+        "price": Decimal(str(data["price"])),
+        "lifecycle": event_status(False, data["date"], capacity, 0),
+    }
+
+
+def _flush(batch):
+    # the INSERT takes the write lock and RETURNING hands back this batch's ids;
+    # no other writer can add rows between them before we commit, so the whole
+    # range is ours and can be indexed in one statement
+    ids = db.session.scalars(db.insert(Event).returning(Event.id), batch).all()
+    index_events_after(db.session.connection(), min(ids) - 1, max(ids))
+    db.session.commit()
+
+
+def import_events(rows, owner_id: int, batch_size=None, max_errors: int = 100) -> ImportResult:
+    """Validate and insert rows in executemany batches, one transaction per batch."""
+    batch_size = batch_size or current_app.config["IMPORT_BATCH_SIZE"]
+    imported = rejected = 0
+    errors = []
+    batch = []
+    for line_no, row in enumerate(rows, start=1):
+        data, row_errors = validate_row(row)
+        if row_errors:
+            rejected += 1
+            if len(errors) < max_errors:
+                errors.append((line_no, row_errors))
+            continue
+        batch.append(_event_values(data, owner_id))
+        if len(batch) >= batch_size:
+            _flush(batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        _flush(batch)
+        imported += len(batch)
+    if imported:
+        notify_event_changed(None)
+    return ImportResult(imported, rejected, errors)
+
+
+def _serialise(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _stream(stmt, fieldnames, fmt: str):
+    """Yield CSV/JSONL text for stmt's rows, fetched yield_per at a time."""
+    result = db.session.execute(stmt.execution_options(yield_per=current_app.config["EXPORT_CHUNK_SIZE"]))
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer:
+        writer.writerow(fieldnames)
+    for chunk in result.partitions():
+        for row in chunk:
+            if writer:
+                writer.writerow(row)
+            else:
+                buf.write(json.dumps(dict(zip(fieldnames, map(_serialise, row)))))
+                buf.write("\n")
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def export_events(fmt: str, owner_id=None):
+    stmt = db.select(*[getattr(Event, f) for f in EVENT_EXPORT_FIELDS]).order_by(Event.id)
+    if owner_id is not None:
+        stmt = stmt.where(Event.owner_id == owner_id)
+    return _stream(stmt, EVENT_EXPORT_FIELDS, fmt)
+
+
+def export_orders(fmt: str, owner_id=None):
+    stmt = (
+        db.select(Order.order_id, Order.event_id, Event.title, Order.user_id, Order.qty, Order.price,
+                  Order.created_at)
+        .join(Event, Event.id == Order.event_id)
+        .order_by(Order.id)
+    )
+    if owner_id is not None:
+        stmt = stmt.where(Event.owner_id == owner_id)
+    return _stream(stmt, ORDER_EXPORT_FIELDS, fmt)
+
+
+def _download(chunks, fmt, name):
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={name}.{fmt}"})
+
+
+@bulk_bp.route('/my-events/import', methods=['GET', 'POST'])
+@login_required
+def import_page():
+    form = ImportForm()
+    if form.validate_on_submit():
+        stream = io.TextIOWrapper(form.file.data.stream, encoding="utf-8-sig", newline="")
+        try:
+            result = import_events(read_rows(stream, form.format.data), current_user.id)
+        except (ValueError, csv.Error) as e:
+            db.session.rollback()
+            flash(f"Could not read the file: {e}")
+            return render_template('events/import.html', form=form)
+        flash(f"Imported {result.imported} events, rejected {result.rejected}.")
+        for line_no, errs in result.errors[:10]:
+            flash(f"Row {line_no}: " + "; ".join(f"{k}: {', '.join(v)}" for k, v in errs.items()))
+        return redirect(url_for('main.my_events'))
+    return render_template('events/import.html', form=form)
+
+
+@bulk_bp.route('/my-events/export.<fmt>')
+@login_required
+def export_events_download(fmt):
+    if fmt not in FORMATS:
+        return redirect(url_for('main.my_events'))
+    return _download(export_events(fmt, owner_id=current_user.id), fmt, "events")
+
+
+@bulk_bp.route('/my-events/orders.<fmt>')
+@login_required
+def export_orders_download(fmt):
+    if fmt not in FORMATS:
+        return redirect(url_for('main.my_events'))
+    return _download(export_orders(fmt, owner_id=current_user.id), fmt, "orders")
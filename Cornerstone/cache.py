@@ -0,0 +1,156 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+_MISSING = object()
+
+
+def _weigh(value) -> int:
+    """Rough memory footprint of a cached value, counting the text it holds."""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(_weigh(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """In-process LRU with a per-entry TTL. Thread-safe; one copy per worker.
+
+    With max_bytes set, entries are also evicted to keep their total weight under it.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300, max_bytes=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires, _ = item
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def _remove(self, key):
+        _, _, weight = self._data.pop(key)
+        self.bytes -= weight
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        weight = _weigh(value) if self.max_bytes else 0
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires, weight)
+            self.bytes += weight
+            while self._data and (len(self._data) > self.maxsize
+                                  or (self.max_bytes and self.bytes > self.max_bytes)):
+                self._remove(next(iter(self._data)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"size": len(self._data), "bytes": self.bytes, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None}
+
+
+class FileCache:
+    """One pickle file per key in a shared directory, so every worker on the host
+    sees the same entries and the same invalidations. Expiry uses the file mtime."""
+
+    def __init__(self, directory: str, ttl: float = 300):
+        self.directory = directory
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, digest + ".pickle")
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl > time.time():
+                with open(path, "rb") as f:
+                    stored_key, value = pickle.load(f)
+                if stored_key == key:
+                    self.hits += 1
+                    return value
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+        self.misses += 1
+        return default
+
+    def set(self, key, value):
+        # write then rename, so readers never see a half-written file
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".pickle"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None}
+
+
+def get_cache(name: str, maxsize: int = 1024, ttl: float = 300, shared: bool = True, max_bytes=None):
+    """The app's cache called name, created on first use.
+
+    shared caches follow CACHE_BACKEND ('memory' or 'file'); others are always
+    in-process LRUs (max_bytes caps their size).
+    """
+    caches = current_app.extensions.setdefault("cornerstone_caches", {})
+    cache = caches.get(name)
+    if cache is None:
+        if shared and current_app.config.get("CACHE_BACKEND", "memory") == "file":
+            directory = current_app.config.get("CACHE_DIR") or os.path.join(current_app.instance_path, "cache")
+            cache = FileCache(os.path.join(directory, name), ttl=ttl)
+        else:
+            cache = LRUCache(maxsize=maxsize, ttl=ttl, max_bytes=max_bytes)
+        caches[name] = cache
+    return cache
@@ -0,0 +1,218 @@
+import click
+from flask.cli import AppGroup
+
+# flask --app main cornerstone <command>
+cornerstone_cli = AppGroup("cornerstone", help="Cornerstone maintenance commands.")
+
+
+@cornerstone_cli.command("init-db")
+def init_db_command():
+    """Create any missing tables and add the columns and indexes older tables lack."""
+    from .seed import init_db
+    init_db()
+    click.echo("Database initialised.")
+
+
+@cornerstone_cli.command("seed")
+def seed_command():
+    """Add the demo user and events to an empty database."""
+    from .seed import init_db, seed_demo_data
+    init_db()
+    if seed_demo_data():
+        click.echo("Demo data added.")
+    else:
+        click.echo("Events already exist, nothing to seed.")
+
+
+@cornerstone_cli.command("rebuild-search")
+def rebuild_search():
+    """Rebuild the event full-text search index."""
+    from .search import rebuild_index
+    from . import db
+    db.create_all()
+    count = rebuild_index()
+    click.echo(f"Indexed {count} events.")
+
+
+@cornerstone_cli.command("sweep-status")
+def sweep_status_command():
+    """Mark past events Inactive (safe to run from cron)."""
+    from .lifecycle import sweep_statuses
+    click.echo(f"{sweep_statuses()} events marked Inactive.")
+
+
+@cornerstone_cli.command("purge-order-keys")
+@click.option("--days", type=int, default=None, help="Keep this many days (default IDEMPOTENCY_KEY_DAYS).")
+def purge_order_keys_command(days):
+    """Delete old order form idempotency keys (safe to run from cron)."""
+    from .idempotency import purge_keys
+    click.echo(f"Purged {purge_keys(days)} order keys.")
+
+
+@cornerstone_cli.command("recount-comments")
+def recount_comments_command():
+    """Recompute each event's cached comment count."""
+    from .comments import refresh_comment_counts
+    from . import db
+    db.create_all()
+    click.echo(f"Updated {refresh_comment_counts()} events.")
+
+
+@cornerstone_cli.command("rebuild-sales")
+def rebuild_sales_command():
+    """Recompute the daily sales rollup from the order table."""
+    from .analytics import rebuild_sales_rollup
+    from . import db
+    db.create_all()
+    click.echo(f"Wrote {rebuild_sales_rollup()} daily sales rows.")
+
+
+@cornerstone_cli.command("worker")
+@click.option("--threads", type=int, default=1, show_default=True)
+@click.option("--once", is_flag=True, help="Drain the queue and exit instead of polling.")
+def worker_command(threads, once):
+    """Run background job workers (receipts, notifications)."""
+    from flask import current_app
+    from .jobs import start_workers, work, queue_stats
+    from . import notifications  # noqa: F401  registers the handlers
+    if once:
+        click.echo(f"Ran {work()} jobs; queue: {queue_stats()}")
+        return
+    stop = start_workers(current_app._get_current_object(), threads)
+    click.echo(f"Running {threads} worker thread(s); Ctrl+C to stop.")
+    try:
+        while not stop.wait(60):
+            pass
+    except KeyboardInterrupt:
+        stop.set()
+
+
+@cornerstone_cli.command("build-assets")
+def build_assets_command():
+    """Fingerprint, precompress and resize static files into static/build.
+
+    Resized/WebP images need Pillow and .br files need brotli; both are optional.
+    Restart the app afterwards so it loads the new manifest.
+    """
+    from flask import current_app
+    from .assets import build_assets
+    stats = build_assets(current_app.static_folder, current_app.config["ASSET_IMAGE_SIZES"],
+                         current_app.config["ASSET_IMAGE_QUALITY"])
+    click.echo(f"Built {stats['files']} files: {stats['gzip']} gzip, {stats['brotli']} brotli, "
+               f"{stats['resized']} resized, {stats['webp']} webp.")
+    if not stats["pillow"]:
+        click.echo("Pillow not installed: skipped resized and WebP images.")
+    if not stats["brotli_available"]:
+        click.echo("brotli not installed: skipped .br files.")
+
+
+@cornerstone_cli.command("serve")
+@click.option("--host", default=None, help="Default SERVE_HOST.")
+@click.option("--port", type=int, default=None, help="Default SERVE_PORT.")
+@click.option("-w", "--workers", type=int, default=None, help="Worker processes (default SERVE_WORKERS, or one per CPU).")
+@click.option("--threads", type=int, default=None, help="Threads per gunicorn worker.")
+@click.option("--max-requests", type=int, default=None, help="Recycle a worker after this many requests (0 = never).")
+@click.option("--backend", type=click.Choice(["auto", "gunicorn", "builtin"]), default=None)
+@click.option("--access-log/--no-access-log", default=None)
+def serve_command(host, port, workers, threads, max_requests, backend, access_log):
+    """Production server: preforked worker processes sharing one listening socket.
+
+    The app is created and initialised once here; workers are forked from it,
+    open their own database connections and are replaced after --max-requests.
+    """
+    import os
+    from flask import current_app
+    from .serving import serve
+    config = current_app.config
+
+    def pick(value, key):
+        return config[key] if value is None else value
+
+    workers = pick(workers, "SERVE_WORKERS") or os.cpu_count() or 1
+    host, port = pick(host, "SERVE_HOST"), pick(port, "SERVE_PORT")
+    click.echo(f"Serving on http://{host}:{port} with {workers} workers (Ctrl+C to stop).")
+    serve(current_app._get_current_object(), host=host, port=port, workers=workers,
+          threads=pick(threads, "SERVE_THREADS"), max_requests=pick(max_requests, "SERVE_MAX_REQUESTS"),
+          max_requests_jitter=config["SERVE_MAX_REQUESTS_JITTER"],
+          graceful_timeout=config["SERVE_GRACEFUL_TIMEOUT"], keepalive=config["SERVE_KEEPALIVE"],
+          access_log=pick(access_log, "SERVE_ACCESS_LOG"), backend=pick(backend, "SERVE_BACKEND"))
+
+
+@cornerstone_cli.command("compile-templates")
+def compile_templates_command():
+    """Fill the template bytecode cache (e.g. while building a deploy image)."""
+    from flask import current_app
+    from .startup import warm_templates
+    if current_app.jinja_env.bytecode_cache is None:
+        raise click.ClickException("TEMPLATE_BYTECODE_CACHE is off.")
+    count = warm_templates(current_app)
+    click.echo(f"Compiled {count} templates into {current_app.jinja_env.bytecode_cache.directory}.")
+
+
+@cornerstone_cli.command("profile-startup")
+@click.option("--top", type=int, default=25, show_default=True, help="Modules to list.")
+@click.option("--path", default="/", show_default=True, help="First request to time ('' to skip).")
+def profile_startup_command(top, path):
+    """Cold-start the app in a fresh process and report per-module import cost.
+
+    Same numbers as `python -X importtime`, summarised: self time per module and
+    per top-level package, plus import / create_app / first request timings.
+    """
+    from flask import current_app
+    from .startup import profile_startup
+    report = profile_startup({"SQLALCHEMY_DATABASE_URI": current_app.config["SQLALCHEMY_DATABASE_URI"]}, path)
+    click.echo(f"import {report['import_ms']:.1f} ms, create_app {report['create_app_ms']:.1f} ms, "
+               f"first request {report['first_request_ms']:.1f} ms, total {report['total_ms']:.1f} ms")
+    click.echo("\nself ms  cumulative ms  module")
+    for module, self_ms, cumulative_ms in report["modules"][:top]:
+        click.echo(f"{self_ms:7.1f}  {cumulative_ms:13.1f}  {module}")
+    click.echo("\nself ms  package")
+    for package, self_ms in report["packages"][:top]:
+        click.echo(f"{self_ms:7.1f}  {package}")
+
+
+def _owner_id(name):
+    from .models import User
+    from . import db
+    user_id = db.session.scalar(db.select(User.id).where(User.name == name))
+    if user_id is None:
+        raise click.BadParameter(f"no user named {name!r}", param_hint="--owner")
+    return user_id
+
+
+@cornerstone_cli.command("import-events")
+@click.argument("source", type=click.File("r", encoding="utf-8-sig"))
+@click.option("--owner", required=True, help="User name that will own the events.")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None,
+              help="Defaults to the file extension.")
+@click.option("--batch-size", type=int, default=None)
+def import_events_command(source, owner, fmt, batch_size):
+    """Stream events from a CSV/JSONL file (or - for stdin) into the database."""
+    from .bulk import import_events, read_rows
+    fmt = fmt or ("jsonl" if source.name.endswith(".jsonl") else "csv")
+    result = import_events(read_rows(source, fmt), _owner_id(owner), batch_size=batch_size)
+    for line_no, errors in result.errors:
+        click.echo(f"row {line_no}: {errors}", err=True)
+    click.echo(f"Imported {result.imported} events, rejected {result.rejected}.")
+
+
+@cornerstone_cli.command("export-events")
+@click.option("--owner", default=None, help="Only this user's events.")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default="csv")
+@click.option("-o", "--output", type=click.File("w", encoding="utf-8"), default="-")
+def export_events_command(owner, fmt, output):
+    """Stream events out as CSV/JSONL."""
+    from .bulk import export_events
+    for chunk in export_events(fmt, owner_id=_owner_id(owner) if owner else None):
+        output.write(chunk)
+
+
+@cornerstone_cli.command("export-orders")
+@click.option("--owner", default=None, help="Only orders for this user's events.")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default="csv")
+@click.option("-o", "--output", type=click.File("w", encoding="utf-8"), default="-")
+def export_orders_command(owner, fmt, output):
+    """Stream orders out as CSV/JSONL."""
+    from .bulk import export_orders
+    for chunk in export_orders(fmt, owner_id=_owner_id(owner) if owner else None):
+        output.write(chunk)
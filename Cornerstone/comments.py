@@ -0,0 +1,39 @@
+from flask import current_app
+from sqlalchemy.orm import joinedload
+
+from .models import Comment, Event
+from .pagination import Page, keyset_page
+from . import db
+
+
+def comment_page(event_id: int, after=None, size=None) -> Page:
+    """One page of an event's comments, newest first, authors joined in."""
+    return keyset_page(
+        db.select(Comment).where(Comment.event_id == event_id).options(joinedload(Comment.user)),
+        [Comment.created_at, Comment.id],
+        size or current_app.config["COMMENTS_PER_PAGE"],
+        after=after,
+        descending=True,
+    )
+
+
+def serialise_comment(comment: Comment) -> dict:
+    return {
+        "id": comment.id,
+        "author": comment.user.name if comment.user else None,
+        "body": comment.body,
+        "created_at": comment.created_at.isoformat(),
+    }
+
+
+def refresh_comment_counts() -> int:
+    """Recompute Event.comment_count from the comment table (after bulk loads); returns events updated."""
+    count = (
+        db.select(db.func.count(Comment.id)).where(Comment.event_id == Event.id).scalar_subquery()
+    )
+    result = db.session.execute(
+        db.update(Event).where(Event.comment_count != count).values(comment_count=count)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,105 @@
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql import Select
+
+# PRAGMAs applied to every new sqlite connection, per profile
+PROFILES = {
+    # sqlite defaults: rollback journal, readers block behind writers
+    "default": {},
+    # WAL lets readers run alongside the single writer; NORMAL sync is safe under WAL
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def _pragmas(config):
+    pragmas = dict(PROFILES[config["DB_PROFILE"]])
+    if config["DB_PROFILE"] != "default":
+        pragmas["busy_timeout"] = config["DB_BUSY_TIMEOUT_MS"]
+        pragmas["cache_size"] = config["DB_CACHE_SIZE"]
+        pragmas["mmap_size"] = config["DB_MMAP_SIZE"]
+    return pragmas
+
+
+def _on_connect(pragmas, read_only=False):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return set_pragmas
+
+
+def dialect_insert(session, table):
+    """An INSERT supporting on_conflict_do_* for the session's database."""
+    dialect = session.get_bind().dialect.name
+    return (postgresql if dialect == "postgresql" else sqlite).insert(table)
+
+
+class RoutingSession(Session):
+    """Sends plain SELECTs to the read engine until the transaction writes.
+
+    Once anything is flushed or a non-SELECT runs, the rest of the transaction
+    stays on the primary so it reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            read_engine = current_app.extensions.get("cornerstone_read_engine")
+            if read_engine is not None:
+                if self._flushing or not isinstance(clause, Select):
+                    self.info["db_writing"] = True
+                elif not self.info.get("db_writing"):
+                    return read_engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+@event.listens_for(RoutingSession, "after_rollback")
+def _end_write(session):
+    session.info.pop("db_writing", None)
+
+
+def init_database(app, db):
+    """Apply the DB_PROFILE engine options, bind db to the app and set up PRAGMAs."""
+    config = app.config
+    config.setdefault("DB_PROFILE", "default")
+    config.setdefault("DB_BUSY_TIMEOUT_MS", 5000)
+    config.setdefault("DB_CACHE_SIZE", -64000)  # negative = KiB, so 64 MB
+    config.setdefault("DB_MMAP_SIZE", 256 * 1024 * 1024)
+    config.setdefault("DB_POOL_SIZE", 10)
+    config.setdefault("DB_MAX_OVERFLOW", 20)
+    config.setdefault("DB_POOL_TIMEOUT", 10)
+    config.setdefault("DB_SPLIT_READS", False)
+    if config["DB_PROFILE"] not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {config['DB_PROFILE']!r}, expected one of {sorted(PROFILES)}")
+
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+    file_backed = uri.startswith("sqlite:///") and ":memory:" not in uri and len(uri) > len("sqlite:///")
+    if config["DB_PROFILE"] != "default" and file_backed:
+        options = config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+        options.setdefault("pool_size", config["DB_POOL_SIZE"])
+        options.setdefault("max_overflow", config["DB_MAX_OVERFLOW"])
+        options.setdefault("pool_timeout", config["DB_POOL_TIMEOUT"])
+        # the driver's own lock wait, in seconds, matching busy_timeout
+        options.setdefault("connect_args", {}).setdefault("timeout", config["DB_BUSY_TIMEOUT_MS"] / 1000)
+
+    db.init_app(app)
+    if not uri.startswith("sqlite"):
+        return
+
+    pragmas = _pragmas(config)
+    with app.app_context():
+        if pragmas:
+            event.listen(db.engine, "connect", _on_connect(pragmas))
+        if config["DB_SPLIT_READS"] and file_backed:
+            read_engine = create_engine(db.engine.url, **config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+            event.listen(read_engine, "connect", _on_connect(pragmas, read_only=True))
+            app.extensions["cornerstone_read_engine"] = read_engine
@@ -0,0 +1,34 @@
+from flask import current_app
+from sqlalchemy import case, func
+
+from .cache import get_cache
+from .models import Event
+from .signals import event_changed
+from . import db
+
+FACETS_KEY = "categories"
+
+
+def category_facets():
+    """[(category, open event count), ...] for the filter chips, cached.
+
+    Dropped whenever an event changes; the TTL covers events closing as dates pass.
+    """
+    cache = get_cache("facets", maxsize=8, ttl=current_app.config["FACET_CACHE_TTL"])
+    facets = cache.get(FACETS_KEY)
+    if facets is None:
+        rows = db.session.execute(
+            db.select(Event.category, func.sum(case((Event.status == "Open", 1), else_=0)))
+            .group_by(Event.category)
+            .order_by(Event.category)
+        ).all()
+        facets = [(category, int(count or 0)) for category, count in rows]
+        cache.set(FACETS_KEY, facets)
+    return facets
+
+
+def _invalidate(app, **extra):
+    get_cache("facets", maxsize=8, ttl=app.config["FACET_CACHE_TTL"]).delete(FACETS_KEY)
+
+
+event_changed.connect(_invalidate)
@@ -1,5 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms.fields import TextAreaField, SubmitField, StringField, PasswordField, IntegerField, DateField, SelectField, FloatField
+from flask_wtf.file import FileField, FileRequired
+from wtforms.fields import HiddenField, TextAreaField, SubmitField, StringField, PasswordField, IntegerField, DateField, SelectField, FloatField
 from wtforms.validators import InputRequired, Length, NumberRange, URL, Email, EqualTo, Optional
 
 # creates the login information
@@ -45,4 +46,14 @@ class CommnetForm(FlaskForm):
 
 class OrderForm(FlaskForm):
     qty = IntegerField("Number of tickets", validators=[InputRequired(), NumberRange(min=1, max=10)])
+    # issued by the waiting room (admission.py) once it's this buyer's turn
+    admission_token = HiddenField()
+    # nonce issued with each rendered form (idempotency.py), so a double-click or a
+    # retried POST returns the first booking instead of making another
+    idempotency_key = HiddenField(validators=[Optional(), Length(max=64)])
     submit = SubmitField("Buy Tickets")
+
+class ImportForm(FlaskForm):
+    file = FileField("Events file", validators=[FileRequired()])
+    format = SelectField("Format", choices=[("csv", "CSV"), ("jsonl", "JSON Lines")], validators=[InputRequired()])
+    submit = SubmitField("Import")
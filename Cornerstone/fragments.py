@@ -0,0 +1,77 @@
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from markupsafe import Markup
+
+from .cache import get_cache
+from .models import Event
+from .signals import event_changed
+from . import db
+
+
+def _card_cache():
+    return get_cache("event_cards", maxsize=100_000, ttl=current_app.config["FRAGMENT_CACHE_TTL"],
+                     shared=False, max_bytes=current_app.config["FRAGMENT_CACHE_MAX_BYTES"])
+
+
+def _page_cache():
+    return get_cache("event_pages", maxsize=100_000, ttl=current_app.config["FRAGMENT_CACHE_TTL"],
+                     shared=False, max_bytes=current_app.config["PAGE_CACHE_MAX_BYTES"])
+
+
+def render_event_card(event: Event) -> Markup:
+    """events/_event_card.html for one event, reused until its version changes.
+
+    The card only depends on the event, so one copy serves every visitor.
+    """
+    key = event.version
+    cache = _card_cache()
+    hit = cache.get(event.id)
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    html = Markup(current_app.jinja_env.get_template("events/_event_card.html").render(event=event))
+    cache.set(event.id, (key, html))
+    return html
+
+
+def page_cacheable() -> bool:
+    """Anonymous GETs with nothing flashed render identically for everyone."""
+    return request.method == "GET" and not current_user.is_authenticated and "_flashes" not in session
+
+
+def cached_event_page(event_id: int, render):
+    """Serve an anonymous detail page from cache with ETag/Last-Modified.
+
+    One narrow query decides freshness; render() only runs on a miss.
+    """
+    row = db.session.execute(
+        db.select(Event.version, Event.updated_at).where(Event.id == event_id)
+    ).first()
+    if row is None:
+        return None
+    # status changes always bump version, so version alone identifies the page
+    etag = f"ev{event_id}-{row.version}"
+
+    cache = _page_cache()
+    hit = cache.get(event_id)
+    if hit is not None and hit[0] == etag:
+        html = hit[1]
+    elif request.if_none_match.contains(etag):
+        # the client already has this version, no need to render it
+        html = ""
+    else:
+        html = render()
+        cache.set(event_id, (etag, html))
+
+    response = make_response(html)
+    response.set_etag(etag)
+    response.last_modified = row.updated_at
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def _invalidate(app, event_id=None, **extra):
+    _card_cache().delete(event_id)
+    _page_cache().delete(event_id)
+
+
+event_changed.connect(_invalidate)
@@ -0,0 +1,65 @@
+import secrets
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from .cache import get_cache
+from .database import dialect_insert
+from .models import Order, OrderRequest
+from . import db
+
+
+def new_key() -> str:
+    """A fresh nonce for an OrderForm."""
+    return secrets.token_urlsafe(24)
+
+
+def _replay_cache():
+    # recently used keys -> Order.id, so a double-click / retry storm is answered
+    # without queueing for the database's write lock
+    return get_cache("order_requests", maxsize=current_app.config["IDEMPOTENCY_CACHE_SIZE"],
+                     ttl=current_app.config["IDEMPOTENCY_CACHE_TTL"])
+
+
+def remember(user_id: int, key: str, order: Order):
+    _replay_cache().set((user_id, key), order.id)
+
+
+def cached_order(user_id: int, key: str):
+    """The order a recent submission with this key made, or None (cache only)."""
+    order_pk = _replay_cache().get((user_id, key))
+    return db.session.get(Order, order_pk) if order_pk is not None else None
+
+
+def claim_key(key: str, user_id: int, event_id: int, order_id: str) -> bool:
+    """Record key in the caller's transaction; False if a submission already has it.
+
+    The unique index makes this the point where concurrent duplicates serialise:
+    the second INSERT waits for the first transaction and then does nothing.
+    """
+    stmt = dialect_insert(db.session, OrderRequest).values(
+        idempotency_key=key, user_id=user_id, event_id=event_id,
+        order_id=order_id, created_at=datetime.utcnow(),
+    ).on_conflict_do_nothing(index_elements=[OrderRequest.idempotency_key])
+    return db.session.execute(stmt).rowcount == 1
+
+
+def replayed_order(user_id: int, key: str):
+    """The order made by an earlier submission of key by this user, or None."""
+    order = db.session.scalar(
+        db.select(Order)
+        .join(OrderRequest, OrderRequest.order_id == Order.order_id)
+        .where(OrderRequest.idempotency_key == key, OrderRequest.user_id == user_id)
+    )
+    if order is not None:
+        remember(user_id, key, order)
+    return order
+
+
+def purge_keys(days: int = None) -> int:
+    """Forget keys older than IDEMPOTENCY_KEY_DAYS; returns rows deleted."""
+    days = current_app.config["IDEMPOTENCY_KEY_DAYS"] if days is None else days
+    result = db.session.execute(
+        db.delete(OrderRequest).where(OrderRequest.created_at < datetime.utcnow() - timedelta(days=days)))
+    db.session.commit()
+    return result.rowcount
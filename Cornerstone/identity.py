@@ -0,0 +1,64 @@
+from flask import current_app
+
+from .cache import get_cache
+from .models import User
+from .signals import user_changed
+from . import db
+
+
+class CachedUser:
+    """What requests need of the logged-in user, without an ORM instance.
+
+    Implements the flask_login user interface; everything else should load
+    the User row explicitly.
+    """
+    __slots__ = ("id", "name")
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+
+    def get_id(self) -> str:
+        return str(self.id)
+
+    def __eq__(self, other):
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<CachedUser id={self.id} name={self.name!r}>"
+
+
+def _user_cache():
+    return get_cache("users", maxsize=current_app.config["USER_CACHE_SIZE"],
+                     ttl=current_app.config["USER_CACHE_TTL"], shared=False)
+
+
+def load_identity(user_id):
+    """login_manager.user_loader: cached snapshot, one narrow query on a miss."""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    cache = _user_cache()
+    user = cache.get(user_id)
+    if user is None:
+        row = db.session.execute(db.select(User.id, User.name).where(User.id == user_id)).first()
+        if row is None:
+            return None
+        user = CachedUser(row.id, row.name)
+        cache.set(user_id, user)
+    return user
+
+
+def _invalidate(app, user_id=None, **extra):
+    _user_cache().delete(user_id)
+
+
+user_changed.connect(_invalidate)
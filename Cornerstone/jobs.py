@@ -0,0 +1,148 @@
+import json
+import logging
+import random
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+
+from flask import current_app
+from sqlalchemy import or_
+
+from .database import dialect_insert
+from .models import Job
+from . import db
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# kind -> handler(payload: dict, key: str); handlers must be safe to run twice
+# for the same key, since a worker can die after the work but before marking it done
+TASKS: Dict[str, Callable] = {}
+
+
+def task(kind: str):
+    """Register a job handler under kind."""
+    def register(fn):
+        TASKS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(kind: str, payload: dict, key: str, delay: float = 0, max_attempts: int = None):
+    """Queue a job in the caller's transaction; a second job with the same key is ignored."""
+    stmt = dialect_insert(db.session, Job).values(
+        kind=kind,
+        payload=json.dumps(payload),
+        idempotency_key=key,
+        state=QUEUED,
+        max_attempts=max_attempts or current_app.config["JOB_MAX_ATTEMPTS"],
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+        created_at=datetime.utcnow(),
+    )
+    db.session.execute(stmt.on_conflict_do_nothing(index_elements=[Job.idempotency_key]))
+
+
+def claim():
+    """Lease the oldest runnable job to this worker, or None.
+
+    Runnable means queued and due, or running with an expired lease (its worker died).
+    Claiming is a single conditional UPDATE, so two workers never get the same job.
+    """
+    now = datetime.utcnow()
+    runnable = (
+        db.select(Job.id)
+        .where(or_(
+            (Job.state == QUEUED) & (Job.run_at <= now),
+            (Job.state == RUNNING) & (Job.locked_until < now),
+        ))
+        .order_by(Job.run_at, Job.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    row = db.session.execute(
+        db.update(Job)
+        .where(Job.id == runnable)
+        .values(
+            state=RUNNING,
+            attempts=Job.attempts + 1,
+            locked_until=now + timedelta(seconds=current_app.config["JOB_LEASE_SECONDS"]),
+        )
+        .returning(Job.id, Job.kind, Job.payload, Job.idempotency_key, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.session.commit()
+    return row
+
+
+def _retry_delay(attempts: int) -> float:
+    backoff = current_app.config["JOB_RETRY_BACKOFF"]
+    return backoff * (2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+
+
+def run_job(row) -> str:
+    """Run one claimed job and record the outcome; returns the new state."""
+    job_id, kind, payload, key, attempts, max_attempts = row
+    values = {"locked_until": None}
+    try:
+        handler = TASKS.get(kind)
+        if handler is None:
+            raise LookupError(f"no handler for job kind {kind!r}")
+        handler(json.loads(payload), key)
+        values.update(state=DONE, finished_at=datetime.utcnow(), last_error=None)
+    except Exception:
+        db.session.rollback()
+        logger.warning("job %s (%s) failed on attempt %d", job_id, kind, attempts, exc_info=True)
+        values["last_error"] = traceback.format_exc(limit=5)
+        if attempts >= max_attempts:
+            values.update(state=FAILED, finished_at=datetime.utcnow())
+        else:
+            values.update(state=QUEUED, run_at=datetime.utcnow() + timedelta(seconds=_retry_delay(attempts)))
+    db.session.execute(
+        db.update(Job).where(Job.id == job_id).values(**values).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return values["state"]
+
+
+def work(limit: int = None) -> int:
+    """Run due jobs until the queue is empty (or limit jobs ran); returns jobs run."""
+    ran = 0
+    while limit is None or ran < limit:
+        row = claim()
+        if row is None:
+            break
+        run_job(row)
+        ran += 1
+    return ran
+
+
+def start_workers(app, threads: int, poll_interval: float = None):
+    """Run job workers on daemon threads; returns an Event that stops them."""
+    stop = threading.Event()
+    poll_interval = poll_interval or app.config["JOB_POLL_INTERVAL"]
+
+    def run():
+        while not stop.is_set():
+            try:
+                with app.app_context():
+                    ran = work(limit=100)
+            except Exception:
+                logger.exception("job worker failed")
+                ran = 0
+            if not ran:
+                stop.wait(poll_interval)
+
+    for n in range(threads):
+        threading.Thread(target=run, name=f"job-worker-{n}", daemon=True).start()
+    return stop
+
+
+def queue_stats() -> dict:
+    """Job counts by state."""
+    rows = db.session.execute(db.select(Job.state, db.func.count()).group_by(Job.state)).all()
+    return {state: count for state, count in rows}
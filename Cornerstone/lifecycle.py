@@ -0,0 +1,47 @@
+import logging
+import threading
+from datetime import date, datetime
+
+from .models import Event
+from .signals import notify_event_changed
+from . import db
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_statuses() -> int:
+    """Flip past Open / Sold Out events to Inactive. Idempotent; returns rows changed."""
+    ids = db.session.scalars(
+        db.select(Event.id).where(Event.lifecycle.in_(("Open", "Sold Out")), Event.date < date.today())
+    ).all()
+    if not ids:
+        return 0
+    db.session.execute(
+        db.update(Event)
+        .where(Event.id.in_(ids), Event.lifecycle.in_(("Open", "Sold Out")))
+        .values(lifecycle="Inactive", version=Event.version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    for event_id in ids:
+        notify_event_changed(event_id)
+    return len(ids)
+
+
+def start_status_sweeper(app, interval: float):
+    """Run sweep_statuses() every interval seconds on a daemon thread."""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                with app.app_context():
+                    swept = sweep_statuses()
+                if swept:
+                    logger.info("status sweep: %d events now Inactive", swept)
+            except Exception:
+                logger.exception("status sweep failed")
+
+    thread = threading.Thread(target=run, name="status-sweeper", daemon=True)
+    thread.start()
+    return stop
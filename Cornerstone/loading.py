@@ -0,0 +1,76 @@
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
+
+from .models import Event, Order
+from . import db
+
+# named eager-loading profiles, one per view that walks relationships.
+# built lazily because backrefs like Order.event only exist once mappers are configured
+PROFILES = {
+    # comments are paged separately (comments.comment_page)
+    "event_detail": lambda: (),
+    # every order row needs its event title
+    "orders": lambda: (joinedload(Order.event),),
+    # cards only use event columns
+    "event_list": lambda: (),
+}
+
+# max statements per endpoint before the test-mode guard fails the request
+DEFAULT_BUDGETS = {
+    "main.index": 3,
+    "main.index_json": 3,
+    "main.event_detail": 5,
+    "main.orders": 3,
+    "main.my_events": 3,
+    "main.event_comments_json": 3,
+    "main.event_queue": 3,
+    "main.event_queue_json": 2,
+    "main.sales": 4,
+    "main.sales_json": 4,
+    "api.events": 1,
+    "api.event": 1,
+}
+
+
+def load_options(profile: str):
+    """Loader options for a named profile, for select(...).options(*...) or session.get."""
+    return PROFILES[profile]()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.sql_statements = g.get("sql_statements", 0) + 1
+
+
+def init_query_budget(app):
+    """Count SQL statements per request and fail page loads over their budget.
+
+    Only GET/HEAD requests are checked, since that is where N+1 loading shows up.
+    Meant for tests (on by default when app.testing); costs nothing when off.
+    """
+    app.config.setdefault("SQL_QUERY_BUDGET_ENFORCE", app.testing)
+    app.config.setdefault("SQL_QUERY_BUDGETS", dict(DEFAULT_BUDGETS))
+    app.config.setdefault("SQL_QUERY_BUDGET_DEFAULT", 20)
+    if not app.config["SQL_QUERY_BUDGET_ENFORCE"]:
+        return
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _count_statement)
+
+    @app.after_request
+    def _check_query_budget(response):
+        if request.method not in ("GET", "HEAD"):
+            return response
+        budgets = current_app.config["SQL_QUERY_BUDGETS"]
+        budget = budgets.get(request.endpoint, current_app.config["SQL_QUERY_BUDGET_DEFAULT"])
+        used = g.get("sql_statements", 0)
+        if used > budget:
+            raise QueryBudgetExceeded(
+                f"{request.method} {request.path} ({request.endpoint}) ran {used} SQL statements, budget is {budget}"
+            )
+        return response
@@ -0,0 +1,54 @@
+import os
+import re
+from email.message import EmailMessage
+
+from flask import current_app
+
+
+def _message(to: str, subject: str, body: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = current_app.config["MAIL_SENDER"]
+    msg["To"] = to
+    msg["Subject"] = subject
+    msg.set_content(body)
+    return msg
+
+
+def outbox() -> list:
+    """Messages sent with MAIL_BACKEND='memory', for tests and benchmarks."""
+    return current_app.extensions.setdefault("cornerstone_outbox", [])
+
+
+def sink_dir() -> str:
+    return current_app.config["MAIL_SINK_DIR"] or os.path.join(current_app.instance_path, "mail")
+
+
+def send_mail(to: str, subject: str, body: str, key: str):
+    """Deliver a message through MAIL_BACKEND.
+
+    key identifies the message; the local sinks write each key once, so a retried
+    job doesn't send a duplicate. 'file' drops .eml files in MAIL_SINK_DIR
+    (default instance/mail), 'memory' appends to outbox(), 'smtp' sends via MAIL_SERVER.
+    """
+    msg = _message(to, subject, body)
+    backend = current_app.config["MAIL_BACKEND"]
+    if backend == "file":
+        directory = sink_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]", "_", key) + ".eml")
+        try:
+            with open(path, "xb") as f:
+                f.write(bytes(msg))
+        except FileExistsError:
+            pass
+    elif backend == "memory":
+        sent = outbox()
+        if all(k != key for k, _ in sent):
+            sent.append((key, msg))
+    elif backend == "smtp":
+        import smtplib  # only the smtp backend needs it
+        msg["Message-ID"] = f"<{key}@{current_app.config['MAIL_SERVER']}>"
+        with smtplib.SMTP(current_app.config["MAIL_SERVER"], current_app.config["MAIL_PORT"], timeout=10) as smtp:
+            smtp.send_message(msg)
+    else:
+        raise ValueError(f"unknown MAIL_BACKEND {backend!r}")
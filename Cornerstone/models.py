@@ -1,7 +1,9 @@
 from . import db
 from datetime import datetime, date
 from flask_login import UserMixin
-from sqlalchemy import Numeric
+from sqlalchemy import Numeric, case, event, inspect
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import object_session
 from uuid import uuid4
 
 #USER
@@ -32,6 +34,13 @@ class User(db.Model, UserMixin):
 #EVENT
 class Event(db.Model):
     __tablename__ = "event"
+    # keyset pagination indexes: home page, category filter, my events
+    __table_args__ = (
+        db.Index("ix_event_date_id", "date", "id"),
+        db.Index("ix_event_category_date_id", "category", "date", "id"),
+        db.Index("ix_event_owner_date", "owner_id", "date"),
+        db.Index("ix_event_status_date_id", "status", "date", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -55,31 +64,91 @@ class Event(db.Model):
 
     #lifecycle indicators
     cancelled = db.Column(db.Boolean, nullable=False, default=False)
+    # stored copy of status so SQL can filter/sort on it; kept current on every
+    # write, by the booking UPDATE and by sweep_statuses() as dates pass
+    lifecycle = db.Column("status", db.String(16), nullable=False, default="Open")
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # bumped on every change (including bookings), used as the cache/ETag key
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # maintained by the Comment insert/delete hooks below, so pages never COUNT(*) the comments
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     #Relationships
     comments = db.relationship("Comment", backref="event", lazy=True, cascade= "all, delete-orphan")
     orders = db.relationship("Order", backref="event", lazy=True, cascade="all, delete-orphan")
 
-    @property
+    @hybrid_property
     def status(self) -> str:
         """Assignment-required state: Open / Inactive / Sold Out / Cancelled."""
-        if self.cancelled:
-            return "Cancelled"
-        if self.date < date.today():
-            return "Inactive"
-        if self.capacity and self.tickets_sold >= self.capacity:
-            return "Sold Out"
-        return "Open"
+        if self.lifecycle is None:
+            return event_status(self.cancelled, self.date, self.capacity or 0, self.tickets_sold or 0)
+        return self.lifecycle
+
+    @status.inplace.expression
+    @classmethod
+    def _status_expression(cls):
+        return cls.lifecycle
+
+    def touch(self):
+        """Mark the event changed (e.g. a new comment) so cached copies are refreshed."""
+        self.updated_at = datetime.utcnow()
     
     def __repr__(self):
         return f"<Event id={self.id} title={self.title!r}>"
 
 
+STATUSES = ("Open", "Sold Out", "Inactive", "Cancelled")
+
+
+def event_status(cancelled, event_date, capacity, tickets_sold) -> str:
+    if cancelled:
+        return "Cancelled"
+    if event_date < date.today():
+        return "Inactive"
+    if capacity and tickets_sold >= capacity:
+        return "Sold Out"
+    return "Open"
+
+
+def _refresh_status(target):
+    target.lifecycle = event_status(target.cancelled, target.date, target.capacity or 0, target.tickets_sold or 0)
+
+
+@event.listens_for(Event, "before_insert")
+def _status_on_insert(mapper, connection, target):
+    _refresh_status(target)
+
+
+def _status_for_update(target):
+    """Status to write with an edit. A booking may have committed since this row was
+    loaded, so unless the edit sets tickets_sold itself, the Sold Out test uses the
+    row's current count in SQL, as the booking UPDATE does."""
+    if inspect(target).attrs.tickets_sold.history.has_changes():
+        return event_status(target.cancelled, target.date, target.capacity or 0, target.tickets_sold or 0)
+    status = event_status(target.cancelled, target.date, 0, 0)
+    if status == "Open" and target.capacity:
+        return case((Event.tickets_sold >= target.capacity, "Sold Out"), else_="Open")
+    return status
+
+
+@event.listens_for(Event, "before_update")
+def _bump_version(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and session.is_modified(target, include_collections=False):
+        target.lifecycle = _status_for_update(target)
+        # computed in SQL so a concurrent booking's bump isn't lost
+        target.version = Event.version + 1
+
+
 #COMMENTS
 
 class Comment(db.Model):
     __tablename__ = "comment"
+    # newest-first keyset pages per event (comments.py)
+    __table_args__ = (
+        db.Index("ix_comment_event_created_id", "event_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -90,11 +159,34 @@ class Comment(db.Model):
 
     def __repr__(self):
         return f"<Comment id={self.id} user={self.user_id} event={self.event_id}>"
+
+
+def _adjust_comment_count(connection, event_id, delta):
+    event_table = Event.__table__
+    connection.execute(
+        event_table.update()
+        .where(event_table.c.id == event_id)
+        .values(comment_count=event_table.c.comment_count + delta)
+    )
+
+
+@event.listens_for(Comment, "after_insert")
+def _count_comment(mapper, connection, target):
+    _adjust_comment_count(connection, target.event_id, 1)
+
+
+@event.listens_for(Comment, "after_delete")
+def _uncount_comment(mapper, connection, target):
+    _adjust_comment_count(connection, target.event_id, -1)
     
 
 #Order
 class Order(db.Model):
     __tablename__ = "order"
+    # covers the sales aggregates (analytics.py) without touching the table
+    __table_args__ = (
+        db.Index("ix_order_event_created", "event_id", "created_at", "qty", "price"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -109,6 +201,66 @@ class Order(db.Model):
     def __repr__(self):
         return f"<Order id ={self.id} order_id={self.order_id!r} user={self.user_id} event{self.event_id}>"
     
+
+#Sales rollup: one row per event per day, maintained as orders are booked
+class SalesDaily(db.Model):
+    __tablename__ = "sales_daily"
+
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    tickets = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SalesDaily event={self.event_id} day={self.day}>"
+
+
+#Order form submissions already processed (see idempotency.py)
+class OrderRequest(db.Model):
+    __tablename__ = "order_request"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # the nonce issued with the OrderForm; a replayed POST carries the same one
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id"), nullable=False)
+    # Order.order_id of the booking the first submission made
+    order_id = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<OrderRequest key={self.idempotency_key!r} order_id={self.order_id!r}>"
+
+
+#Background jobs (see jobs.py)
+class Job(db.Model):
+    __tablename__ = "job"
+    # workers poll for the oldest runnable job
+    __table_args__ = (
+        db.Index("ix_job_state_run_at", "state", "run_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+    # one job per key, e.g. "order_receipt:EV3-1A2B3C4D"
+    idempotency_key = db.Column(db.String(128), unique=True, nullable=False)
+
+    # queued -> running -> done, or back to queued for a retry, or failed
+    state = db.Column(db.String(16), nullable=False, default="queued")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<Job id={self.id} kind={self.kind!r} state={self.state}>"
+
+
 def make_order_id(event_id: int) -> str:
     """Generate a unqiue order reference"""
     return f"EV{event_id}-{str(uuid4())[:8].upper()}"
@@ -0,0 +1,52 @@
+from .jobs import enqueue, task
+from .mail import send_mail
+from .models import Event, Order, User
+from . import db
+
+ORDER_RECEIPT = "order_receipt"
+ORGANISER_NOTICE = "organiser_notice"
+
+
+def enqueue_booking_jobs(order: Order):
+    """Queue the post-booking emails in the booking's own transaction."""
+    payload = {"order_id": order.order_id}
+    enqueue(ORDER_RECEIPT, payload, key=f"{ORDER_RECEIPT}:{order.order_id}")
+    enqueue(ORGANISER_NOTICE, payload, key=f"{ORGANISER_NOTICE}:{order.order_id}")
+
+
+def _load(order_id: str):
+    row = db.session.execute(
+        db.select(Order, Event).join(Event, Event.id == Order.event_id).where(Order.order_id == order_id)
+    ).first()
+    if row is None:
+        raise LookupError(f"order {order_id} not found")
+    return row
+
+
+@task(ORDER_RECEIPT)
+def send_order_receipt(payload, key):
+    order, event = _load(payload["order_id"])
+    buyer = db.session.get(User, order.user_id)
+    total = order.price * order.qty
+    send_mail(
+        buyer.email,
+        f"Your tickets for {event.title} ({order.order_id})",
+        f"Hi {buyer.first_name or buyer.name},\n\n"
+        f"Order {order.order_id}: {order.qty} x {event.title}\n"
+        f"{event.venue} on {event.date.strftime('%d/%m/%Y')}\n"
+        f"Total: ${total:.2f}\n",
+        key,
+    )
+
+
+@task(ORGANISER_NOTICE)
+def notify_organiser(payload, key):
+    order, event = _load(payload["order_id"])
+    owner = db.session.get(User, event.owner_id)
+    send_mail(
+        owner.email,
+        f"New booking for {event.title}",
+        f"Order {order.order_id}: {order.qty} tickets.\n"
+        f"{event.tickets_sold} of {event.capacity or 'unlimited'} now sold.\n",
+        key,
+    )
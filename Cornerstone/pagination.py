@@ -0,0 +1,122 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, NamedTuple, Optional
+
+from flask import abort, url_for
+from sqlalchemy import literal, tuple_
+
+from . import db
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+def _encode_value(v):
+    if isinstance(v, datetime):
+        return {"dt": v.isoformat()}
+    if isinstance(v, date):
+        return {"d": v.isoformat()}
+    return v
+
+
+def _decode_value(v):
+    if isinstance(v, dict):
+        if "dt" in v:
+            return datetime.fromisoformat(v["dt"])
+        return date.fromisoformat(v["d"])
+    return v
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _fits(value, key) -> bool:
+    """Whether a decoded cursor value has the Python type of its key column."""
+    try:
+        expected = key.type.python_type
+    except NotImplementedError:
+        # untyped keys, e.g. the fts rank: any plain scalar
+        expected = None
+    if isinstance(value, bool) or value is None or isinstance(value, (list, dict)):
+        return False
+    if expected is datetime:
+        return isinstance(value, datetime)
+    if expected is date:
+        return isinstance(value, date) and not isinstance(value, datetime)
+    if expected is int:
+        return isinstance(value, int)
+    if expected in (float, Decimal):
+        return isinstance(value, (int, float))
+    if expected is str:
+        return isinstance(value, str)
+    return not isinstance(value, date)
+
+
+def decode_cursor(cursor: str, keys):
+    """Decode a cursor for keys from the query string; malformed cursors are a 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = [_decode_value(v) for v in json.loads(raw)]
+    except (ValueError, TypeError, KeyError):
+        abort(400)
+    # well-formed but hand-edited, e.g. ["abc", 1] for a (date, id) cursor
+    if len(values) != len(keys) or not all(_fits(v, k) for v, k in zip(values, keys)):
+        abort(400)
+    return values
+
+
+def keyset_page(stmt, keys, size, after=None, before=None, descending=False, width=1) -> Page:
+    """Fetch one page of stmt ordered by keys, seeking past a cursor instead of OFFSET.
+
+    keys must end in a unique column (usually the primary key) so the order is total.
+    Cost stays O(size) however deep the page, as long as an index covers the keys.
+    Items are the first selected column, or with width > 1 the first width columns
+    as a row tuple.
+    """
+    backwards = before is not None
+    cursor = before if backwards else after
+    # walking backwards flips the scan direction; rows are reversed again below
+    scan_desc = descending != backwards
+
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        bound = tuple_(*[literal(v, type_=k.type) for k, v in zip(keys, values)])
+        stmt = stmt.where(tuple_(*keys) < bound if scan_desc else tuple_(*keys) > bound)
+
+    stmt = stmt.add_columns(*keys).order_by(*[k.desc() if scan_desc else k.asc() for k in keys])
+    rows = db.session.execute(stmt.limit(size + 1)).all()
+
+    more = len(rows) > size
+    rows = rows[:size]
+    if backwards:
+        rows.reverse()
+
+    items = [row[0] for row in rows] if width == 1 else [row[:width] for row in rows]
+    first = encode_cursor(rows[0][width:]) if rows else None
+    last = encode_cursor(rows[-1][width:]) if rows else None
+    if backwards:
+        return Page(items, next_cursor=last, prev_cursor=first if more else None)
+    return Page(items, next_cursor=last if more else None, prev_cursor=first if cursor else None)
+
+
+def pager_urls(page: Page, endpoint: str, **args):
+    """(prev_url, next_url) for a page, keeping the other query args."""
+    prev_url = url_for(endpoint, before=page.prev_cursor, **args) if page.prev_cursor else None
+    next_url = url_for(endpoint, after=page.next_cursor, **args) if page.next_cursor else None
+    return prev_url, next_url
+
+
+def page_size(requested, default: int, maximum: int) -> int:
+    """Clamp a client supplied page size."""
+    try:
+        size = int(requested) if requested else default
+    except ValueError:
+        abort(400)
+    return max(1, min(size, maximum))
@@ -0,0 +1,104 @@
+import os
+import threading
+
+from flask import current_app
+
+# bcrypt and the process pool machinery are imported on first use, so workers
+# that never see a login don't pay for them at startup
+
+
+class HashingOverloaded(Exception):
+    """Too many password hashes already queued; the caller should shed load."""
+
+
+# run in the worker processes. bcrypt only looks at the first 72 bytes; older
+# bcrypt releases truncated silently, so keep doing that for existing hashes.
+def _hash(password: str, rounds: int) -> str:
+    import bcrypt
+    return bcrypt.hashpw(password.encode("utf-8")[:72], bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(hashed: str, password: str) -> bool:
+    import bcrypt
+    try:
+        return bcrypt.checkpw(password.encode("utf-8")[:72], hashed.encode("utf-8"))
+    except ValueError:
+        return False
+
+
+class HashingPool:
+    """Bounded process pool for bcrypt so logins can't starve the request threads."""
+
+    def __init__(self, workers: int, max_pending: int, wait: float):
+        self.workers = workers
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # (re)create lazily and after a fork, since pools don't survive one
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                    self._pid = os.getpid()
+        return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait):
+            raise HashingOverloaded()
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def shutdown(self):
+        # only the process that started the pool can stop its workers
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+
+
+def _pool():
+    pool = current_app.extensions.get("cornerstone_hashing")
+    if pool is None:
+        # every serve worker has its own pool: share the cores out so N workers
+        # don't run N x cores bcrypt processes between them
+        workers = current_app.config["PASSWORD_HASH_WORKERS"] or max(
+            1, (os.cpu_count() or 1) // (current_app.config["SERVE_WORKERS"] or 1))
+        pool = HashingPool(workers, current_app.config["PASSWORD_HASH_MAX_PENDING"] or workers * 4,
+                           current_app.config["PASSWORD_HASH_QUEUE_WAIT"])
+        current_app.extensions["cornerstone_hashing"] = pool
+    return pool
+
+
+def _run(fn, *args):
+    if current_app.config["PASSWORD_HASH_WORKERS"] == 0:
+        return fn(*args)
+    return _pool().run(fn, *args)
+
+
+def hash_password(password: str, inline: bool = False) -> str:
+    """bcrypt hash at BCRYPT_LOG_ROUNDS, computed in the hashing pool unless inline."""
+    rounds = current_app.config["BCRYPT_LOG_ROUNDS"]
+    return _hash(password, rounds) if inline else _run(_hash, password, rounds)
+
+
+def check_password(hashed: str, password: str) -> bool:
+    return _run(_check, hashed, password)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True when hashed was made with a different cost than BCRYPT_LOG_ROUNDS."""
+    try:
+        return int(hashed.split("$")[2]) != current_app.config["BCRYPT_LOG_ROUNDS"]
+    except (IndexError, ValueError):
+        return True
@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from flask import Blueprint, Response, abort, current_app, g, has_app_context, jsonify, render_template, request
+from flask_login import current_user
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+perf_bp = Blueprint('perf', __name__, url_prefix='/_perf')
+
+
+class PerfRecorder:
+    """Keeps the last N request samples in a ring buffer, plus lifetime counters."""
+
+    def __init__(self, size: int):
+        self.samples = deque(maxlen=size)
+        self.totals = defaultdict(int)
+        self.slow_queries = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def record(self, sample: dict):
+        self.samples.append(sample)
+        with self._lock:
+            self.totals[sample["endpoint"]] += 1
+
+    def summary(self):
+        """Per-endpoint aggregates over the samples currently in the buffer."""
+        grouped = defaultdict(list)
+        for s in list(self.samples):
+            grouped[s["endpoint"]].append(s)
+
+        rows = []
+        for endpoint, samples in grouped.items():
+            n = len(samples)
+            walls = sorted(s["wall_ms"] for s in samples)
+            rows.append({
+                "endpoint": endpoint,
+                "requests": n,
+                "requests_total": self.totals[endpoint],
+                "wall_ms_avg": round(sum(walls) / n, 2),
+                "wall_ms_p50": round(walls[n // 2], 2),
+                "wall_ms_p95": round(walls[min(n - 1, int(n * 0.95))], 2),
+                "wall_ms_max": round(walls[-1], 2),
+                "queries_avg": round(sum(s["queries"] for s in samples) / n, 2),
+                "db_ms_avg": round(sum(s["db_ms"] for s in samples) / n, 2),
+                "render_ms_avg": round(sum(s["render_ms"] for s in samples) / n, 2),
+            })
+        rows.sort(key=lambda r: r["wall_ms_avg"] * r["requests"], reverse=True)
+        return rows
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition of the buffered aggregates."""
+        metrics = [
+            ("requests_total", "counter", "Requests handled since start", "requests_total"),
+            ("request_wall_ms_avg", "gauge", "Mean wall time over the sample window", "wall_ms_avg"),
+            ("request_wall_ms_p95", "gauge", "95th percentile wall time over the sample window", "wall_ms_p95"),
+            ("request_queries_avg", "gauge", "Mean SQL statements per request", "queries_avg"),
+            ("request_db_ms_avg", "gauge", "Mean time in the database per request", "db_ms_avg"),
+            ("request_render_ms_avg", "gauge", "Mean template render time per request", "render_ms_avg"),
+        ]
+        rows = self.summary()
+        lines = []
+        for name, kind, help_text, key in metrics:
+            lines.append(f"# HELP cornerstone_{name} {help_text}")
+            lines.append(f"# TYPE cornerstone_{name} {kind}")
+            for r in rows:
+                lines.append(f'cornerstone_{name}{{endpoint="{r["endpoint"]}"}} {r[key]}')
+
+        caches = cache_stats()
+        for key, kind in (("hits", "counter"), ("misses", "counter")):
+            lines.append(f"# HELP cornerstone_cache_{key} Cache {key} in this worker")
+            lines.append(f"# TYPE cornerstone_cache_{key} {kind}")
+            for cache_name, stats in caches.items():
+                lines.append(f'cornerstone_cache_{key}{{cache="{cache_name}"}} {stats[key]}')
+        return "\n".join(lines) + "\n"
+
+
+def cache_stats():
+    """Hit/miss counters for every cache the app has created so far."""
+    return {name: cache.stats() for name, cache in current_app.extensions.get("cornerstone_caches", {}).items()}
+
+
+def _recorder():
+    return current_app.extensions["cornerstone_perf"]
+
+
+# SQL timing
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._perf_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context._perf_start) * 1000
+    if not has_app_context():
+        return
+    stats = g.get("perf")
+    if stats is not None:
+        stats["queries"] += 1
+        stats["db_ms"] += elapsed_ms
+
+    if elapsed_ms >= current_app.config["PERF_SLOW_QUERY_MS"]:
+        plan = None
+        if not executemany and statement.lstrip().upper().startswith("SELECT") and conn.dialect.name == "sqlite":
+            try:
+                rows = cursor.connection.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+                plan = "\n".join(str(r[-1]) for r in rows)
+            except Exception:
+                plan = None
+        logger.warning("slow query (%.1f ms): %s\nplan:\n%s", elapsed_ms, statement, plan or "n/a")
+        _recorder().slow_queries.append({
+            "ms": round(elapsed_ms, 2),
+            "statement": statement,
+            "plan": plan,
+            "endpoint": request.endpoint if stats is not None else None,
+        })
+
+
+# template timing
+def _before_render(sender, template, context, **extra):
+    stats = g.get("perf")
+    if stats is not None:
+        stats["_render_start"] = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    stats = g.get("perf")
+    if stats is not None and "_render_start" in stats:
+        stats["render_ms"] += (time.perf_counter() - stats.pop("_render_start")) * 1000
+
+
+def init_perf(app):
+    """Wire request/SQL/template timing into the app when PERF_ENABLED is set."""
+    app.config.setdefault("PERF_ENABLED", False)
+    app.config.setdefault("PERF_BUFFER_SIZE", 2000)
+    app.config.setdefault("PERF_SLOW_QUERY_MS", 100)
+    if not app.config["PERF_ENABLED"]:
+        return
+
+    app.extensions["cornerstone_perf"] = PerfRecorder(app.config["PERF_BUFFER_SIZE"])
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(db.engine, "after_cursor_execute", _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def _perf_start():
+        g.perf = {"start": time.perf_counter(), "queries": 0, "db_ms": 0.0, "render_ms": 0.0}
+
+    @app.after_request
+    def _perf_record(response):
+        stats = g.pop("perf", None)
+        if stats is None or request.endpoint is None or request.endpoint.startswith("perf."):
+            return response
+        _recorder().record({
+            "ts": time.time(),
+            "endpoint": request.endpoint,
+            "method": request.method,
+            "status": response.status_code,
+            "wall_ms": (time.perf_counter() - stats["start"]) * 1000,
+            "queries": stats["queries"],
+            "db_ms": stats["db_ms"],
+            "render_ms": stats["render_ms"],
+        })
+        return response
+
+    app.register_blueprint(perf_bp)
+
+
+@perf_bp.before_request
+def _private():
+    # SQL text and route timings aren't for the public: logged-in users, or debug mode
+    if not (current_app.debug or current_user.is_authenticated):
+        abort(404)
+
+
+@perf_bp.route('')
+def dashboard():
+    rec = _recorder()
+    return render_template('perf/dashboard.html', rows=rec.summary(), slow=list(rec.slow_queries)[::-1],
+                           threshold=current_app.config["PERF_SLOW_QUERY_MS"], caches=cache_stats())
+
+
+@perf_bp.route('/json')
+def export_json():
+    rec = _recorder()
+    return jsonify(endpoints=rec.summary(), slow_queries=list(rec.slow_queries), caches=cache_stats())
+
+
+@perf_bp.route('/metrics')
+def export_prometheus():
+    return Response(_recorder().prometheus(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,107 @@
+import re
+
+from sqlalchemy import DDL, event, inspect, or_, text, table, column
+
+from .models import Event
+from . import db
+
+# fts5 index over the searchable event text, keyed by event.id (the fts rowid)
+event_fts = table("event_fts", column("rowid"), column("rank"), column("event_fts"))
+
+INDEXED_FIELDS = ("title", "venue", "artist", "description")
+
+_create_fts = DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS event_fts "
+    "USING fts5(title, venue, artist, description, tokenize='unicode61 remove_diacritics 2')"
+)
+event.listen(db.metadata, "after_create", _create_fts.execute_if(dialect="sqlite"))
+
+_insert_sql = text(
+    "INSERT INTO event_fts (rowid, title, venue, artist, description) "
+    "VALUES (:id, :title, :venue, :artist, :description)"
+)
+_delete_sql = text("DELETE FROM event_fts WHERE rowid = :id")
+
+
+def _row(target):
+    return {
+        "id": target.id,
+        "title": target.title or "",
+        "venue": target.venue or "",
+        "artist": target.artist or "",
+        "description": target.description or "",
+    }
+
+
+# keep the index in step with the ORM, inside the same transaction as the write
+@event.listens_for(Event, "after_insert")
+def _index_insert(mapper, connection, target):
+    if connection.dialect.name == "sqlite":
+        connection.execute(_insert_sql, _row(target))
+
+
+@event.listens_for(Event, "after_update")
+def _index_update(mapper, connection, target):
+    if connection.dialect.name != "sqlite":
+        return
+    state = inspect(target)
+    # cancelling or selling tickets doesn't touch the indexed text
+    if not any(state.attrs[f].history.has_changes() for f in INDEXED_FIELDS):
+        return
+    connection.execute(_delete_sql, {"id": target.id})
+    connection.execute(_insert_sql, _row(target))
+
+
+@event.listens_for(Event, "after_delete")
+def _index_delete(mapper, connection, target):
+    if connection.dialect.name == "sqlite":
+        connection.execute(_delete_sql, {"id": target.id})
+
+
+def to_match_query(q: str):
+    """Turn free text into an fts5 query: every word must match, as a prefix."""
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def apply_search(stmt, q: str):
+    """Restrict an Event select to rows matching q.
+
+    Returns (stmt, rank) where rank is the relevance column to order by (lower is
+    better), or None when falling back to the plain ILIKE filter.
+    """
+    match = to_match_query(q)
+    if match is None or db.engine.dialect.name != "sqlite":
+        like = f"%{q}%"
+        return stmt.where(or_(Event.title.ilike(like), Event.venue.ilike(like), Event.artist.ilike(like))), None
+    stmt = (
+        stmt.join(event_fts, event_fts.c.rowid == Event.id)
+        .where(event_fts.c.event_fts.op("MATCH")(match))
+    )
+    return stmt, event_fts.c.rank
+
+
+_index_after_sql = text(
+    "INSERT INTO event_fts (rowid, title, venue, artist, description) "
+    "SELECT id, coalesce(title, ''), coalesce(venue, ''), coalesce(artist, ''), coalesce(description, '') "
+    "FROM event WHERE id > :after_id AND id <= :last_id"
+)
+
+
+def index_events_after(connection, after_id: int, last_id: int = 2 ** 63 - 1):
+    """Index events with after_id < id <= last_id, for bulk inserts that skip the ORM hooks."""
+    if connection.dialect.name == "sqlite":
+        connection.execute(_index_after_sql, {"after_id": after_id, "last_id": last_id})
+
+
+def rebuild_index() -> int:
+    """Recreate the search index from the event table; returns the rows indexed."""
+    conn = db.session.connection()
+    conn.execute(_create_fts)
+    conn.execute(text("DELETE FROM event_fts"))
+    index_events_after(conn, 0)
+    conn.execute(text("INSERT INTO event_fts (event_fts) VALUES ('optimize')"))
+    db.session.commit()
+    return db.session.scalar(db.select(db.func.count()).select_from(event_fts))
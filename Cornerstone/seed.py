@@ -0,0 +1,182 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import inspect, literal, text
+
+from .models import User, Event, Order, SalesDaily, event_status
+from .passwords import hash_password
+from . import db
+
+DEMO_EVENTS = [
+    dict(
+        title="Underground Rap Night",
+        description="A night for upcoming artists to go head-to-head. Doors 6:30pm.",
+        image_url="img/1.jpg",
+        category="Rap",
+        venue="Central Music Park",
+        artist="Various",
+        days_ahead=7,
+        capacity=120,
+        price=Decimal("29.99"),
+    ),
+    dict(
+        title="Vibin at the Loft",
+        description="Smooth grooves and late-night jazz standards.",
+        image_url="img/2.jpg",
+        category="Jazz",
+        venue="The Loft",
+        artist="Vibin",
+        days_ahead=12,
+        capacity=80,
+        price=Decimal("24.50"),
+    ),
+    dict(
+        title="Funky Town",
+        description="Get down with classic soul and funk.",
+        image_url="img/3.jpg",
+        category="Soul",
+        venue="Colters",
+        artist="Funky Town",
+        days_ahead=18,
+        capacity=200,
+        price=Decimal("35.00"),
+    ),
+    dict(
+        title="Rhythm & Blues",
+        description="R&B showcase with guest vocalists.",
+        image_url="img/4.jpg",
+        category="RnB",
+        venue="The Loft",
+        artist="Various",
+        days_ahead=22,
+        capacity=150,
+        price=Decimal("27.00"),
+    ),
+    dict(
+        title="Rap Festival",
+        description="Multi-stage hip-hop festival all day.",
+        image_url="img/5.jpg",
+        category="Rap",
+        venue="Central Music Park",
+        artist="Several",
+        days_ahead=30,
+        capacity=500,
+        price=Decimal("59.90"),
+    ),
+]
+
+
+def init_db():
+    """Create any missing tables (and the search index) and upgrade older ones in place."""
+    db.create_all()
+    upgrade_db()
+
+
+def _column_default(column):
+    # the value existing rows get: server default, else the model default (called if a function)
+    if column.server_default is not None:
+        arg = column.server_default.arg
+        return text(arg) if isinstance(arg, str) else arg
+    if column.default is not None:
+        arg = column.default.arg
+        return literal(arg(None) if column.default.is_callable else arg, column.type)
+    return None
+
+
+def _add_column(conn, table, column):
+    dialect = conn.dialect
+    ddl = (f"ALTER TABLE {dialect.identifier_preparer.format_table(table)} "
+           f"ADD COLUMN {dialect.identifier_preparer.format_column(column)} {column.type.compile(dialect)}")
+    default = _column_default(column)
+    if default is not None:
+        ddl += " DEFAULT " + str(default.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+        if not column.nullable:
+            ddl += " NOT NULL"
+    conn.execute(text(ddl))
+
+
+def _backfill_status():
+    # existing rows all got the 'Open' default; work out their real status once
+    rows = db.session.execute(db.select(Event.id, Event.cancelled, Event.date, Event.capacity, Event.tickets_sold))
+    updates = [{"b_id": row.id, "b_status": event_status(row.cancelled, row.date, row.capacity, row.tickets_sold)}
+               for row in rows]
+    if updates:
+        table = Event.__table__
+        db.session.execute(table.update().where(table.c.id == db.bindparam("b_id"))
+                           .values(status=db.bindparam("b_status")), updates)
+
+
+def _backfill_comment_counts():
+    from .comments import refresh_comment_counts
+    refresh_comment_counts()
+
+
+# columns that need more than their default value on rows that predate them
+_BACKFILLS = {
+    ("event", "status"): _backfill_status,
+    ("event", "comment_count"): _backfill_comment_counts,
+}
+
+
+def upgrade_db() -> list:
+    """Add columns and indexes the models have gained since a table was created
+    (create_all never alters an existing table), backfill the columns, the
+    sales rollup and the search index. Idempotent; returns the "table.column" names added."""
+    conn = db.session.connection()
+    inspector = inspect(conn)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        present = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in present:
+                _add_column(conn, table, column)
+                added.append((table.name, column.name))
+    for key in added:
+        if key in _BACKFILLS:
+            _BACKFILLS[key]()
+    # indexes are likewise only made along with a new table
+    conn = db.session.connection()  # a backfill may have committed
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    db.session.commit()
+    # sales_daily is only maintained for new bookings: fill it for orders made before it existed
+    from .analytics import rebuild_sales_rollup
+    if (db.session.scalar(db.select(SalesDaily.event_id).limit(1)) is None
+            and db.session.scalar(db.select(Order.id).limit(1)) is not None):
+        rebuild_sales_rollup()
+    # likewise the search index, created empty next to an existing event table
+    if db.engine.dialect.name == "sqlite":
+        from .search import event_fts, rebuild_index
+        if (db.session.scalar(db.select(event_fts.c.rowid).limit(1)) is None
+                and db.session.scalar(db.select(Event.id).limit(1)) is not None):
+            rebuild_index()
+    return [f"{table}.{column}" for table, column in added]
+
+
+def seed_demo_data() -> bool:
+    """Add the demo user and events in one transaction if there are no events yet."""
+    if db.session.scalar(db.select(Event.id).limit(1)) is not None:
+        return False
+
+    demo = db.session.scalar(db.select(User).where(User.email == "demo@example.com"))
+    if not demo:
+        demo = User(
+            name="demo",
+            first_name="Demo",
+            last_name="User",
+            email="demo@example.com",
+            # inline: no worker pool in the startup process
+            password_hash=hash_password("password", inline=True),
+        )
+        db.session.add(demo)
+
+    today = date.today()
+    for spec in DEMO_EVENTS:
+        spec = dict(spec)
+        days_ahead = spec.pop("days_ahead")
+        db.session.add(Event(owner=demo, date=today + timedelta(days=days_ahead), **spec))
+    db.session.commit()
+    return True
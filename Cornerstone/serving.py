@@ -0,0 +1,237 @@
+import itertools
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+# names of the threads start_background() may run (lifecycle.py, jobs.py)
+BACKGROUND_THREADS = ("status-sweeper", "job-worker-")
+
+
+def start_background(app, sweep_interval: float = 0):
+    """Start the status sweeper and job worker threads the config asks for.
+
+    sweep_interval is used when STATUS_SWEEP_INTERVAL is 0 (serve workers pass theirs).
+    """
+    stops = []
+    sweep_interval = app.config["STATUS_SWEEP_INTERVAL"] or sweep_interval
+    if sweep_interval:
+        from .lifecycle import start_status_sweeper
+        stops.append(start_status_sweeper(app, sweep_interval))
+    if app.config["JOB_WORKERS"]:
+        from .jobs import start_workers
+        stops.append(start_workers(app, app.config["JOB_WORKERS"]))
+    app.extensions["cornerstone_background"] = stops
+
+
+def stop_background(app, timeout: float = 30):
+    """Stop those threads and wait for them, so nothing is mid-query when we fork."""
+    for stop in app.extensions.pop("cornerstone_background", ()):
+        stop.set()
+    deadline = time.monotonic() + timeout
+    for thread in threading.enumerate():
+        if thread.name.startswith(BACKGROUND_THREADS):
+            thread.join(max(0, deadline - time.monotonic()))
+
+
+def pre_fork(app):
+    """In the master, once the app is initialised: leave nothing open for workers to inherit."""
+    stop_background(app)
+    with app.app_context():
+        db.engine.dispose()
+    read_engine = app.extensions.get("cornerstone_read_engine")
+    if read_engine is not None:
+        read_engine.dispose()
+
+
+def post_fork(app):
+    """In each worker: its own connection pools and background threads."""
+    with app.app_context():
+        # close=False: drop anything inherited without closing the parent's handles
+        db.engine.dispose(close=False)
+    read_engine = app.extensions.get("cornerstone_read_engine")
+    if read_engine is not None:
+        read_engine.dispose(close=False)
+    start_background(app, app.config["SERVE_STATUS_SWEEP_INTERVAL"])
+
+
+def serve(app, host: str, port: int, workers: int, threads: int, max_requests: int,
+          max_requests_jitter: int, graceful_timeout: float, keepalive: float,
+          access_log: bool = False, backend: str = "auto"):
+    """Serve app from `workers` processes forked after it was created (preloaded).
+
+    backend 'gunicorn' (gthread workers) is used when installed and backend is
+    'auto'; 'builtin' is a small preforking server on werkzeug. Workers exit after
+    max_requests (plus up to max_requests_jitter) requests and are replaced.
+    """
+    if backend == "auto":
+        try:
+            import gunicorn  # noqa: F401
+            backend = "gunicorn"
+        except ImportError:
+            backend = "builtin"
+    # never serve tracebacks / auto-reload templates from a production server
+    app.debug = False
+    # the resolved count, for settings shared out between workers (passwords.py)
+    app.config["SERVE_WORKERS"] = workers
+    pre_fork(app)
+    logger.info("serving on %s:%s with %d %s workers", host, port, workers, backend)
+    if backend == "gunicorn":
+        _serve_gunicorn(app, host, port, workers, threads, max_requests, max_requests_jitter,
+                        graceful_timeout, keepalive, access_log)
+    else:
+        _serve_builtin(app, host, port, workers, max_requests, max_requests_jitter,
+                       graceful_timeout, keepalive, access_log)
+
+
+def _serve_gunicorn(app, host, port, workers, threads, max_requests, max_requests_jitter,
+                    graceful_timeout, keepalive, access_log):
+    from gunicorn.app.base import BaseApplication
+
+    settings = {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "gthread",
+        "threads": threads,
+        "max_requests": max_requests,
+        "max_requests_jitter": max_requests_jitter,
+        "graceful_timeout": graceful_timeout,
+        "keepalive": keepalive,
+        "accesslog": "-" if access_log else None,
+        # the app object already exists, so it is loaded once in the master either way
+        "preload_app": True,
+        "post_fork": lambda server, worker: post_fork(app),
+    }
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    Server().run()
+
+
+class _RequestHandler(WSGIRequestHandler):
+    """Quiet unless asked; idle keep-alive connections close after `timeout` seconds."""
+    access_log = False
+    timeout = 5
+
+    def log_request(self, code="-", size="-"):
+        if self.access_log:
+            super().log_request(code, size)
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        # a draining worker answers what it's given but keeps no connection open
+        if self.server.draining:
+            self.close_connection = True
+
+
+def _serve_builtin(app, host, port, workers, max_requests, max_requests_jitter,
+                   graceful_timeout, keepalive, access_log):
+    listener = socket.create_server((host, port), backlog=2048)
+    # every worker waits on the same socket; whoever loses the accept() race
+    # gets EAGAIN and goes back to waiting instead of blocking
+    listener.setblocking(False)
+    handler = type("RequestHandler", (_RequestHandler,), {"access_log": access_log, "timeout": keepalive})
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                _worker(app, listener, host, port, handler, max_requests, max_requests_jitter)
+            except BaseException:
+                logger.exception("worker %d crashed", os.getpid())
+                status = 1
+            finally:
+                os._exit(status)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if stopping:
+            # second Ctrl+C: don't wait for in-flight requests
+            kill(signum, frame)
+            return
+        stopping = True
+        for pid in list(children):
+            os.kill(pid, signal.SIGTERM)
+        signal.alarm(max(1, int(graceful_timeout)))
+
+    def kill(signum, frame):
+        for pid in list(children):
+            os.kill(pid, signal.SIGKILL)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGALRM, kill)
+    for _ in range(workers):
+        spawn()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        if os.waitstatus_to_exitcode(status) != 0:
+            logger.warning("worker %d exited with status %s", pid, os.waitstatus_to_exitcode(status))
+            # don't fork in a tight loop if workers die straight away
+            if time.monotonic() - started < 1:
+                time.sleep(1)
+        spawn()
+    listener.close()
+
+
+def _worker(app, listener, host, port, handler, max_requests, max_requests_jitter):
+    # drop the master's handlers first: until the server is up there is nothing
+    # to drain, so a SIGTERM should just end this process, not run the master's stop()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGALRM, signal.SIG_DFL)
+    # Ctrl+C reaches the whole process group; the master turns it into SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    post_fork(app)
+
+    limit = max_requests + random.randint(0, max_requests_jitter) if max_requests else 0
+    served = itertools.count(1)
+
+    def drain(*args):
+        # stop accepting, finish in-flight requests, then exit; shutdown() waits for the
+        # accept loop, so it can't run on that loop's own thread
+        server.draining = True
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    def counted(environ, start_response):
+        if next(served) == limit:
+            drain()
+        return app(environ, start_response)
+
+    server = make_server(host, port, counted, threaded=True, request_handler=handler, fd=listener.fileno())
+    server.draining = False
+    # request threads are joined by server_close(), so recycling never cuts one off
+    server.daemon_threads = False
+    signal.signal(signal.SIGTERM, drain)
+    server.serve_forever(poll_interval=0.5)
+    server.server_close()
+    # the bcrypt pool's processes would outlive os._exit() otherwise
+    hashing = app.extensions.get("cornerstone_hashing")
+    if hashing is not None:
+        hashing.shutdown()
+    with app.app_context():
+        db.engine.dispose()
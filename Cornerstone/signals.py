@@ -0,0 +1,51 @@
+from blinker import Namespace
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from .database import RoutingSession
+from .models import Event, User
+
+_signals = Namespace()
+
+# sent with sender=app and event_id=... once a change to an event is committed
+# (event_id=None for bulk changes that don't track individual rows)
+event_changed = _signals.signal("event-changed")
+# sent with sender=app and user_id=... once a change to a user is committed
+user_changed = _signals.signal("user-changed")
+
+
+def _marker(key):
+    def mark_changed(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(key, set()).add(target.id)
+    return mark_changed
+
+
+for _name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Event, _name, _marker("changed_events"))
+    event.listen(User, _name, _marker("changed_users"))
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _send_changes(session):
+    events = session.info.pop("changed_events", None)
+    users = session.info.pop("changed_users", None)
+    if events or users:
+        app = current_app._get_current_object()
+        for event_id in events or ():
+            event_changed.send(app, event_id=event_id)
+        for user_id in users or ():
+            user_changed.send(app, user_id=user_id)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _drop_changes(session):
+    session.info.pop("changed_events", None)
+    session.info.pop("changed_users", None)
+
+
+def notify_event_changed(event_id):
+    """For writes that bypass the ORM (e.g. the booking UPDATE), after commit."""
+    event_changed.send(current_app._get_current_object(), event_id=event_id)
@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+logger = logging.getLogger(__name__)
+
+# one line of `python -X importtime` output: self and cumulative microseconds, then
+# the module name indented by two spaces per nesting level
+IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Bootstrap-Flask also ships macros for other Bootstrap versions; we only use bootstrap5/
+WARMUP_SKIP = ("bootstrap/", "bootstrap4/")
+
+# run in a fresh interpreter: import, create_app, first request, timed separately
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+from Cornerstone import create_app
+t1 = time.perf_counter()
+app = create_app(json.loads({config!r}))
+t2 = time.perf_counter()
+status = app.test_client().get({path!r}).status_code if {path!r} else None
+t3 = time.perf_counter()
+print(json.dumps({{"import_ms": (t1 - t0) * 1000, "create_app_ms": (t2 - t1) * 1000,
+                  "first_request_ms": (t3 - t2) * 1000, "total_ms": (t3 - t0) * 1000,
+                  "status": status}}))
+"""
+
+
+def parse_importtime(text: str) -> list:
+    """[(module, self_us, cumulative_us, depth)] from `-X importtime` stderr."""
+    rows = []
+    for line in text.splitlines():
+        match = IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def cold_start(config: dict = None, path: str = "/", importtime: bool = False) -> dict:
+    """Import, create_app and GET path ('' to skip) in a fresh interpreter.
+
+    Returns the phase timings in milliseconds and the response status; with
+    importtime, also the child's raw `-X importtime` output under "importtime".
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = _CHILD.format(root=root, config=json.dumps(config or {}), path=path)
+    flags = ["-X", "importtime"] if importtime else []
+    out = subprocess.run([sys.executable, *flags, "-c", code], check=True, capture_output=True, text=True)
+    report = json.loads(out.stdout.strip().splitlines()[-1])
+    if importtime:
+        report["importtime"] = out.stderr
+    return report
+
+
+def profile_startup(config: dict = None, path: str = "/") -> dict:
+    """Cold-start the app in a child interpreter under -X importtime.
+
+    Returns the phase timings plus per-module self time and per-package totals,
+    both in milliseconds and sorted most expensive first.
+    """
+    report = cold_start(config, path, importtime=True)
+    modules = parse_importtime(report.pop("importtime"))
+    packages = defaultdict(int)
+    for module, self_us, _, _ in modules:
+        packages[module.partition(".")[0]] += self_us
+    report["modules"] = sorted(((m, s / 1000, c / 1000) for m, s, c, _ in modules),
+                               key=lambda row: row[1], reverse=True)
+    report["packages"] = sorted(((p, us / 1000) for p, us in packages.items()),
+                                key=lambda row: row[1], reverse=True)
+    return report
+
+
+def init_templates(app):
+    """Keep compiled templates on disk and compile them before the first request.
+
+    The bytecode cache lets every new worker skip Jinja's parse/compile step; with
+    TEMPLATE_WARMUP the templates are loaded here, so a preforking server does it
+    once in the master and the forked workers inherit them.
+    """
+    if app.config["TEMPLATE_BYTECODE_CACHE"]:
+        directory = app.config["TEMPLATE_CACHE_DIR"] or os.path.join(app.root_path, "instance", "jinja_cache")
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    if app.config["TEMPLATE_WARMUP"]:
+        return warm_templates(app)
+    return 0
+
+
+def warm_templates(app) -> int:
+    """Load the HTML templates (the app's and its extensions') into the Jinja cache.
+
+    A template that doesn't compile is logged and skipped; rendering it still fails.
+    """
+    loaded = 0
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        if name.startswith(WARMUP_SKIP):
+            continue
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateSyntaxError:
+            logger.exception("template %s failed to compile during warm-up", name)
+            continue
+        loaded += 1
+    return loaded
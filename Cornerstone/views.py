@@ -1,8 +1,17 @@
-from flask import Blueprint, render_template, request, abort, flash, redirect, url_for
+from flask import Blueprint, render_template, request, abort, flash, redirect, url_for, jsonify, current_app
 from flask_login import login_required, current_user
-from sqlalchemy import or_
-from .models import Event, Comment, Order, make_order_id
+from .models import Event, Comment, Order, STATUSES
 from .forms import EventForm, CommnetForm, OrderForm
+from .booking import reserve_tickets, CLOSED, SOLD_OUT, CONTENDED, REPLAYED
+from .idempotency import cached_order, new_key
+from .search import apply_search
+from .pagination import keyset_page, pager_urls, page_size
+from .loading import load_options
+from .facets import category_facets
+from .fragments import page_cacheable, cached_event_page
+from .analytics import event_sales, daily_sales
+from .admission import waiting_room
+from .comments import comment_page, serialise_comment
 from . import db
 from decimal import Decimal
 
@@ -10,31 +19,70 @@ from decimal import Decimal
 main_bp = Blueprint('main', __name__)
 
 
-# Main page
-@main_bp.route('/')
-def index():
+def _event_listing():
+    """Shared filtering + keyset paging for the home page and its JSON twin."""
     category = request.args.get("category") or None
+    status = request.args.get("status") if request.args.get("status") in STATUSES else None
     q = (request.args.get("q") or "").strip()
+    size = page_size(request.args.get("limit"), current_app.config["EVENTS_PER_PAGE"],
+                     current_app.config["MAX_PAGE_SIZE"])
 
-    stmt = db.select(Event).order_by(Event.date)
+    stmt = db.select(Event).options(*load_options("event_list"))
+    keys = [Event.date, Event.id]
     if category:
         stmt = stmt.where(Event.category == category)
+    if status:
+        # served by ix_event_status_date_id
+        stmt = stmt.where(Event.status == status)
     if q:
-        like = f"%{q}%"
-        stmt = stmt.where(or_(Event.title.ilike(like), Event.venue.ilike(like), Event.artist.ilike(like)))
+        # full-text match, best matches first
+        stmt, rank = apply_search(stmt, q)
+        if rank is not None:
+            keys.insert(0, rank)
 
-    events = db.session.scalars(stmt).all()
+    page = keyset_page(stmt, keys, size,
+                       after=request.args.get("after"), before=request.args.get("before"))
+    return page, category, status, q
 
-    categories = db.session.scalars(
-        db.select(Event.category).distinct().order_by(Event.category)
-    ).all()
+
+# Main page
+@main_bp.route('/')
+def index():
+    page, category, status, q = _event_listing()
+    prev_url, next_url = pager_urls(page, 'main.index', category=category, status=status, q=q or None)
 
     return render_template(
         "events/list.html",
-        events=events,
-        categories=categories,
+        events=page.items,
+        facets=category_facets(),
         category=category,
+        status=status,
+        statuses=STATUSES,
         q=q,
+        prev_url=prev_url,
+        next_url=next_url,
+    )
+
+@main_bp.route('/events.json')
+def index_json():
+    page, category, status, q = _event_listing()
+    return jsonify(
+        events=[
+            {
+                "id": e.id,
+                "title": e.title,
+                "artist": e.artist,
+                "venue": e.venue,
+                "category": e.category,
+                "date": e.date.isoformat(),
+                "price": str(e.price),
+                "status": e.status,
+                "url": url_for('main.event_detail', event_id=e.id),
+            }
+            for e in page.items
+        ],
+        next=page.next_cursor,
+        prev=page.prev_cursor,
     )
 
 #FIX
@@ -47,18 +95,26 @@ def me():
 # Event details route
 @main_bp.route('/events/<int:event_id>', methods=['GET', 'POST'])
 def event_detail(event_id):
-    event = db.session.get(Event, event_id)
-    if not event: abort(404)
-    
     comment_form = CommnetForm()
     order_form = OrderForm()
 
+    # anonymous visitors all see the same first page: serve it cached / as a 304
+    if page_cacheable() and not request.args.get("comments_after"):
+        response = cached_event_page(
+            event_id, lambda: _render_event_detail(event_id, comment_form, order_form))
+        if response is None: abort(404)
+        return response
+
+    event = db.session.get(Event, event_id, options=load_options("event_detail"))
+    if not event: abort(404)
+
     # Comment post
     if comment_form.submit.data and comment_form.validate_on_submit():
         if not current_user.is_authenticated:
             flash("Please log in to post a comment.")
             return redirect(url_for('auth.login', next=request.path))
         c = Comment(user_id=current_user.id, event_id=event.id, body=comment_form.body.data.strip())
+        event.touch()
         db.session.add(c); db.session.commit()
         flash("Comment posted.")
         return redirect(url_for('main.event_detail', event_id=event.id))
@@ -69,30 +125,98 @@ def event_detail(event_id):
             flash("Please log in to buy tickets.")
             return redirect(url_for('auth.login', next=request.path))
 
-        qty = order_form.qty.data
-        # status/stock checks
-        if event.cancelled or event.status != "Open":
+        # a resubmitted form seen recently: answer it without queueing or booking
+        key = order_form.idempotency_key.data or None
+        order = cached_order(current_user.id, key) if key else None
+        if order is not None:
+            flash(f"Booking confirmed. Order ID: {order.order_id}")
+            return redirect(url_for('main.orders'))
+
+        # on-sale spikes: only ADMISSION_CONCURRENCY buyers book at once, the rest queue
+        room = waiting_room()
+        token = order_form.admission_token.data
+        if room and not room.check(event.id, current_user.id, token):
+            admission = room.enter(event.id, current_user.id)
+            if not admission.admitted:
+                return redirect(url_for('main.event_queue', event_id=event.id, qty=order_form.qty.data, key=key))
+            token = admission.token
+        try:
+            result = reserve_tickets(event.id, current_user.id, order_form.qty.data, key)
+        finally:
+            if room:
+                room.release(event.id, token)
+        if result.status == CLOSED:
             flash("This event isn’t open for booking.")
             return redirect(url_for('main.event_detail', event_id=event.id))
-        if event.capacity and event.tickets_sold + qty > event.capacity:
+        if result.status == SOLD_OUT:
             flash("Not enough tickets available.")
             return redirect(url_for('main.event_detail', event_id=event.id))
+        if result.status == CONTENDED:
+            flash("Ticket sales are very busy right now, please try again.")
+            return redirect(url_for('main.event_detail', event_id=event.id))
+        if result.status == REPLAYED and result.order is None:
+            flash("This order form was already submitted.")
+            return redirect(url_for('main.event_detail', event_id=event.id))
 
-        unit_price = Decimal(event.price)
-        order = Order(
-            user_id=current_user.id,
-            event_id=event.id,
-            qty=qty,
-            price=unit_price,
-            order_id=make_order_id(event.id),
-        )
-        event.tickets_sold += qty
-        db.session.add(order)
-        db.session.commit()
-        flash(f"Booking confirmed. Order ID: {order.order_id}")
+        flash(f"Booking confirmed. Order ID: {result.order.order_id}")
         return redirect(url_for('main.orders'))
 
-    return render_template('events/detail.html', event=event, comment_form=comment_form, order_form=order_form)
+    return _render_event_detail(event_id, comment_form, order_form, event=event)
+
+def _queue_state(event_id):
+    status = db.session.scalar(db.select(Event.lifecycle).where(Event.id == event_id))
+    if status is None: abort(404)
+    room = waiting_room()
+    admission = room.enter(event_id, current_user.id) if room and status == "Open" else None
+    return status, admission
+
+# Waiting room: polled until the buyer is admitted, then shows the order form with their token
+@main_bp.route('/events/<int:event_id>/queue')
+@login_required
+def event_queue(event_id):
+    status, admission = _queue_state(event_id)
+    if status == "Open" and admission is None:
+        return redirect(url_for('main.event_detail', event_id=event_id))
+    order_form = OrderForm(qty=request.args.get("qty", 1, type=int),
+                           idempotency_key=request.args.get("key") or new_key())
+    if admission is not None and admission.admitted:
+        order_form.admission_token.data = admission.token
+    return render_template('events/queue.html', event_id=event_id, status=status, admission=admission,
+                           order_form=order_form, poll_interval=current_app.config["ADMISSION_POLL_INTERVAL"])
+
+@main_bp.route('/events/<int:event_id>/queue.json')
+@login_required
+def event_queue_json(event_id):
+    status, admission = _queue_state(event_id)
+    body = {"status": status, "admitted": False, "position": None, "waiting": 0, "token": None,
+            "retry_after": current_app.config["ADMISSION_POLL_INTERVAL"]}
+    if admission is not None:
+        body.update(admission._asdict(), admitted=admission.admitted)
+    elif status == "Open":
+        body["admitted"] = True
+    response = jsonify(body)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+def _render_event_detail(event_id, comment_form, order_form, event=None):
+    event = event or db.session.get(Event, event_id, options=load_options("event_detail"))
+    if current_user.is_authenticated and not order_form.idempotency_key.data:
+        order_form.idempotency_key.data = new_key()
+    comments = comment_page(event_id, after=request.args.get("comments_after"))
+    return render_template('events/detail.html', event=event, comments=comments.items,
+                           comments_cursor=comments.next_cursor, comment_form=comment_form, order_form=order_form)
+
+# Further comment pages for the detail page's "Older comments" link
+@main_bp.route('/events/<int:event_id>/comments.json')
+def event_comments_json(event_id):
+    count = db.session.scalar(db.select(Event.comment_count).where(Event.id == event_id))
+    if count is None: abort(404)
+    size = page_size(request.args.get("size"), current_app.config["COMMENTS_PER_PAGE"],
+                     current_app.config["MAX_PAGE_SIZE"])
+    page = comment_page(event_id, after=request.args.get("after"), size=size)
+    next_url = url_for('main.event_comments_json', event_id=event_id, after=page.next_cursor, size=size) \
+        if page.next_cursor else None
+    return jsonify(count=count, comments=[serialise_comment(c) for c in page.items], next=next_url)
 
 
 
@@ -125,7 +249,10 @@ def create_event():
 @login_required
 def orders():
     orders = db.session.scalars(
-        db.select(Order).where(Order.user_id==current_user.id).order_by(Order.created_at.desc())
+        db.select(Order)
+        .where(Order.user_id==current_user.id)
+        .options(*load_options("orders"))
+        .order_by(Order.created_at.desc())
     ).all()
     return render_template('orders/list.html', orders=orders)
 
@@ -173,8 +300,34 @@ def cancel_event(event_id):
 @main_bp.route('/my-events')
 @login_required
 def my_events():
-    events = db.session.scalars(
-        db.select(Event).where(Event.owner_id == current_user.id).order_by(Event.date.desc())
-    ).all()
-    return render_template('events/my_events.html', events=events)
-    
\ No newline at end of file
+    page = keyset_page(
+        db.select(Event).where(Event.owner_id == current_user.id),
+        [Event.date, Event.id],
+        current_app.config["EVENTS_PER_PAGE"],
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        descending=True,
+    )
+    prev_url, next_url = pager_urls(page, 'main.my_events')
+    return render_template('events/my_events.html', events=page.items, prev_url=prev_url, next_url=next_url)
+
+@main_bp.route('/my-events/sales')
+@login_required
+def sales():
+    events = event_sales(current_user.id)
+    days = daily_sales(current_user.id)
+    totals = {
+        "orders": sum(e.orders for e in events),
+        "tickets": sum(e.tickets for e in events),
+        "revenue": sum((e.revenue for e in events), Decimal("0.00")),
+    }
+    return render_template('events/sales.html', events=events, days=days, totals=totals)
+
+@main_bp.route('/my-events/sales.json')
+@login_required
+def sales_json():
+    return jsonify(
+        events=[dict(e._asdict(), date=e.date.isoformat(), revenue=str(e.revenue), sell_through=e.sell_through)
+                for e in event_sales(current_user.id)],
+        days=[dict(d._asdict(), day=d.day.isoformat(), revenue=str(d.revenue)) for d in daily_sales(current_user.id)],
+    )
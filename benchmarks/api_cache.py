@@ -0,0 +1,75 @@
+"""/api/v1/events throughput on one core: cached 200s, conditional 304s, and
+uncached responses (API_CACHE_TTL=0), against a seeded dataset.
+
+Calls the WSGI app directly, so the figures are the server-side cost per request
+without HTTP parsing or a test client in the way.
+
+    python benchmarks/api_cache.py --scale small --seconds 3
+"""
+import argparse
+import json
+import time
+
+from werkzeug.test import EnvironBuilder
+
+from common import make_app, cleanup
+from dataset import Scale, seed
+
+PATHS = ("/api/v1/events", "/api/v1/events?category=Jazz&limit=50",
+         "/api/v1/events?status=Open&date_from=2030-01-01", "/api/v1/events/{hot}")
+
+
+def _start_response(status, headers, exc_info=None):
+    _start_response.status = status
+
+
+def measure(app, paths, seconds, headers=None):
+    environs = []
+    for path in paths:
+        builder = EnvironBuilder(path=path, headers=headers or {})
+        environs.append(builder.get_environ())
+        builder.close()
+    count, deadline = 0, time.perf_counter() + seconds
+    statuses = set()
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for environ in environs:
+            body = app(dict(environ), _start_response)
+            b"".join(body)
+            if hasattr(body, "close"):
+                body.close()
+            statuses.add(_start_response.status)
+            count += 1
+    elapsed = time.perf_counter() - start
+    return {"requests": count, "requests_per_sec": round(count / elapsed),
+            "us_per_request": round(elapsed / count * 1e6, 1), "statuses": sorted(statuses)}
+
+
+def run(args, cached):
+    app = make_app(API_CACHE_TTL=args.ttl if cached else 0)
+    try:
+        with app.app_context():
+            info = seed(Scale.preset(args.scale))
+        paths = [p.format(hot=info["hot_event_id"]) for p in PATHS]
+        report = {"cached": cached, "full": measure(app, paths, args.seconds)}
+        if cached:
+            client = app.test_client()
+            etags = {p: client.get(p).headers["ETag"] for p in paths}
+            report["not_modified"] = measure(
+                app, paths[:1], args.seconds, headers={"If-None-Match": etags[paths[0]]})
+        return report
+    finally:
+        cleanup(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", choices=sorted(Scale.PRESETS), default="small")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--ttl", type=float, default=600, help="API_CACHE_TTL for the cached run")
+    args = parser.parse_args()
+    print(json.dumps([run(args, False), run(args, True)], indent=2))
+
+
+if __name__ == "__main__":
+    main()
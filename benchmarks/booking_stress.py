@@ -0,0 +1,67 @@
+"""Fire many parallel bookings at one event and check it never oversells.
+
+    python benchmarks/booking_stress.py --bookings 5000 --threads 32 --capacity 500
+"""
+import argparse
+import collections
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import make_app, make_user, make_event, cleanup, db
+from Cornerstone.booking import reserve_tickets
+from Cornerstone.models import Event, Order
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--capacity", type=int, default=500)
+    parser.add_argument("--qty", type=int, default=1)
+    args = parser.parse_args()
+
+    app = make_app(SQLALCHEMY_ENGINE_OPTIONS={"pool_size": args.threads, "max_overflow": 0})
+    with app.app_context():
+        user_id = make_user()
+        event_id = make_event(user_id, title="Rap Festival", capacity=args.capacity)
+
+    outcomes = collections.Counter()
+    lock = threading.Lock()
+
+    def book(_):
+        with app.app_context():
+            result = reserve_tickets(event_id, user_id, args.qty)
+        with lock:
+            outcomes[result.status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(book, range(args.bookings)))
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        sold = db.session.scalar(db.select(Event.tickets_sold).where(Event.id == event_id))
+        ordered = db.session.scalar(
+            db.select(db.func.coalesce(db.func.sum(Order.qty), 0)).where(Order.event_id == event_id))
+    cleanup(app)
+
+    report = {
+        "attempts": args.bookings,
+        "threads": args.threads,
+        "capacity": args.capacity,
+        "tickets_sold": sold,
+        "tickets_in_orders": ordered,
+        "outcomes": dict(outcomes),
+        "seconds": round(elapsed, 3),
+        "bookings_per_sec": round(args.bookings / elapsed, 1),
+    }
+    print(json.dumps(report, indent=2))
+
+    assert sold <= args.capacity, "oversold!"
+    assert sold == ordered, "tickets_sold out of step with orders"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Bulk import/export throughput: rows/sec and peak RSS for a generated file.
+
+    python benchmarks/bulk_import.py --rows 1000000 --format csv
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+
+from common import make_app, make_user, cleanup
+from Cornerstone.bulk import export_events, import_events, read_rows
+
+CATEGORIES = ["Rap", "Soul", "Jazz", "RnB"]
+FIELDS = ["title", "artist", "description", "date", "venue", "category", "image_url", "capacity", "price"]
+
+
+def generate(path, rows, fmt, bad_every):
+    today = date.today()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, FIELDS) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+        for i in range(rows):
+            row = {
+                "title": f"Bulk event {i}",
+                "artist": f"Artist {i % 997}",
+                "description": "Generated for the bulk import benchmark.",
+                "date": (today + timedelta(days=random.randint(-30, 365))).isoformat(),
+                "venue": f"Venue {i % 101}",
+                "category": CATEGORIES[i % len(CATEGORIES)],
+                "image_url": "",
+                "capacity": random.randint(0, 5000),
+                "price": round(random.uniform(0, 200), 2),
+            }
+            if bad_every and i % bad_every == 0:
+                row["date"] = "not a date"
+            if writer:
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(row) + "\n")
+
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--bad-every", type=int, default=1000, help="make every Nth row invalid (0 = none)")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix="." + args.format)
+    os.close(fd)
+    generate(path, args.rows, args.format, args.bad_every)
+    app = make_app(IMPORT_BATCH_SIZE=args.batch_size)
+    try:
+        with app.app_context():
+            owner_id = make_user("bulk")
+            with open(path, newline="", encoding="utf-8") as f:
+                start = time.perf_counter()
+                result = import_events(read_rows(f, args.format), owner_id)
+                import_secs = time.perf_counter() - start
+            rss_after_import = peak_rss_mb()
+
+            start = time.perf_counter()
+            exported = sum(len(chunk) for chunk in export_events(args.format))
+            export_secs = time.perf_counter() - start
+
+        print(json.dumps({
+            "rows": args.rows,
+            "format": args.format,
+            "batch_size": args.batch_size,
+            "imported": result.imported,
+            "rejected": result.rejected,
+            "import_secs": round(import_secs, 2),
+            "import_rows_per_sec": round(args.rows / import_secs),
+            "export_secs": round(export_secs, 2),
+            "export_rows_per_sec": round(result.imported / export_secs) if export_secs else None,
+            "export_bytes": exported,
+            "peak_rss_mb_after_import": rss_after_import,
+            "peak_rss_mb": peak_rss_mb(),
+        }, indent=2))
+    finally:
+        os.remove(path)
+        cleanup(app)
+
+
+if __name__ == "__main__":
+    main()
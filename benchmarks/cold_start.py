@@ -0,0 +1,60 @@
+"""Measure cold start: fresh interpreter -> import -> create_app -> first response.
+
+Each run is a new process. 'empty' runs start from a missing database and an empty
+template cache (schema, demo data and compiled templates are created), 'existing'
+runs reuse both from the previous run, like a new worker on an already-deployed host.
+
+    python benchmarks/cold_start.py --runs 5
+    python benchmarks/cold_start.py --no-template-cache   # compile templates on first use
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# allow running the script straight from a checkout: python benchmarks/cold_start.py
+sys.path.insert(0, ROOT)
+
+# the same child script `flask cornerstone profile-startup` runs
+from Cornerstone.startup import cold_start  # noqa: E402
+
+
+def median(values):
+    values = sorted(values)
+    return round(values[len(values) // 2], 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-template-cache", action="store_true",
+                        help="disable the template bytecode cache and warm-up")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cold.sqlite")
+        cache_dir = os.path.join(tmp, "jinja_cache")
+        config = {"SQLALCHEMY_DATABASE_URI": "sqlite:///" + db_path.replace("\\", "/"),
+                  "TEMPLATE_CACHE_DIR": cache_dir}
+        if args.no_template_cache:
+            config.update(TEMPLATE_BYTECODE_CACHE=False, TEMPLATE_WARMUP=False)
+        for mode in ("empty", "existing"):
+            runs = []
+            for _ in range(args.runs):
+                if mode == "empty":
+                    if os.path.exists(db_path):
+                        os.remove(db_path)
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+                runs.append(cold_start(config))
+            report[mode] = {key: median(r[key] for r in runs)
+                            for key in ("import_ms", "create_app_ms", "first_request_ms", "total_ms")}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
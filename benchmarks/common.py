@@ -0,0 +1,63 @@
+"""Shared helpers for the benchmark scripts: throwaway apps on a temp database."""
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+# allow running the scripts straight from a checkout: python benchmarks/<script>.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Cornerstone import create_app, db  # noqa: E402
+from Cornerstone.models import User, Event  # noqa: E402
+
+
+def make_app(db_path=None, **config):
+    """Create an app bound to its own sqlite file (a fresh temp file by default)."""
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(prefix="cornerstone-bench-", suffix=".sqlite")
+        os.close(fd)
+        os.remove(db_path)
+    config.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + db_path.replace("\\", "/"))
+    config.setdefault("WTF_CSRF_ENABLED", False)
+    # tables are created by create_app; benchmarks bring their own data
+    config.setdefault("SEED_DEMO_DATA", False)
+    # keep the shared waiting-room state next to the temp database, not in instance/
+    config.setdefault("ADMISSION_DB", db_path + ".admission")
+    app = create_app(config)
+    app.config["BENCH_DB_PATH"] = db_path
+    return app
+
+
+def make_user(name="bench", password_hash="x"):
+    """Insert a user without paying for bcrypt; returns the user id."""
+    user = User(name=name, first_name=name, last_name="Bench",
+                email=f"{name}@example.com", password_hash=password_hash)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def make_event(owner_id, title="Bench Event", capacity=500, days_ahead=30, **kwargs):
+    """Insert a single future event; returns the event id."""
+    kwargs.setdefault("description", "Benchmark event")
+    kwargs.setdefault("category", "Rap")
+    kwargs.setdefault("venue", "Bench Hall")
+    kwargs.setdefault("artist", "Various")
+    kwargs.setdefault("price", Decimal("10.00"))
+    e = Event(owner_id=owner_id, title=title, capacity=capacity,
+              date=date.today() + timedelta(days=days_ahead), **kwargs)
+    db.session.add(e)
+    db.session.commit()
+    return e.id
+
+
+def cleanup(app):
+    """Dispose the engine and remove the temp database files."""
+    path = app.config.get("BENCH_DB_PATH")
+    with app.app_context():
+        db.engine.dispose()
+    for base in (path, path and path + ".admission"):
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if base and os.path.exists(base + suffix):
+                os.remove(base + suffix)
@@ -0,0 +1,127 @@
+"""Synthetic Cornerstone data at a configurable scale, inserted in executemany
+batches straight through the models' tables.
+
+    from dataset import Scale, seed
+    info = seed(Scale.preset("medium"))
+"""
+import random
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from common import db
+from Cornerstone.analytics import rebuild_sales_rollup
+from Cornerstone.comments import refresh_comment_counts
+from Cornerstone.models import Comment, Event, Order, User
+from Cornerstone.passwords import hash_password
+from Cornerstone.search import rebuild_index
+
+PASSWORD = "password"
+CATEGORIES = ("Rap", "Soul", "Jazz", "RnB")
+WORDS = ("midnight groove live session festival underground brass choir acoustic electric "
+         "summer winter vinyl loft park night soul jazz rap blues funk").split()
+
+
+@dataclass
+class Scale:
+    users: int = 200
+    events: int = 2_000
+    comments: int = 20_000
+    orders: int = 20_000
+    # comments on the one "hot" event used by the detail scenario
+    hot_comments: int = 2_000
+
+    PRESETS = {
+        "small": dict(users=50, events=200, comments=2_000, orders=2_000, hot_comments=500),
+        "medium": {},
+        "large": dict(users=5_000, events=50_000, comments=500_000, orders=500_000, hot_comments=10_000),
+    }
+
+    @classmethod
+    def preset(cls, name: str, **overrides):
+        values = dict(cls.PRESETS[name])
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**values)
+
+
+def _batches(rows, size=20_000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(model, rows):
+    for batch in _batches(rows):
+        db.session.execute(db.insert(model), batch)
+        db.session.commit()
+
+
+def seed(scale: Scale, seed_value: int = 207) -> dict:
+    """Fill an empty database; returns ids the scenarios need plus the counts."""
+    rnd = random.Random(seed_value)
+    now = datetime.utcnow()
+    today = date.today()
+    # one real bcrypt hash shared by every user, so the login scenario pays the true cost
+    password_hash = hash_password(PASSWORD, inline=True)
+
+    _insert(User, ({
+        "name": f"user{i}", "first_name": "User", "last_name": str(i),
+        "email": f"user{i}@example.com", "password_hash": password_hash, "created_at": now,
+    } for i in range(scale.users)))
+    user_ids = db.session.scalars(db.select(User.id).order_by(User.id)).all()
+
+    def event_row(i):
+        days = rnd.randint(-60, 365)
+        words = rnd.sample(WORDS, 3)
+        return {
+            "owner_id": rnd.choice(user_ids), "title": f"{words[0].title()} {words[1].title()} {i}",
+            "artist": f"Artist {i % 500}", "description": " ".join(rnd.choices(WORDS, k=20)),
+            "venue": f"Venue {i % 97}", "category": rnd.choice(CATEGORIES), "image_url": None,
+            "date": today + timedelta(days=days), "capacity": rnd.choice((0, 100, 500, 5000)),
+            "tickets_sold": 0, "price": Decimal(rnd.choice(("15.00", "29.50", "59.90"))),
+            "lifecycle": "Open" if days >= 0 else "Inactive", "cancelled": False,
+            "created_at": now, "updated_at": now, "version": 1,
+        }
+    _insert(Event, (event_row(i) for i in range(scale.events)))
+    open_ids = db.session.scalars(
+        db.select(Event.id).where(Event.lifecycle == "Open").order_by(Event.id)).all()
+    hot_id, booking_id = open_ids[0], open_ids[1]
+    # the booking scenario needs an event that won't sell out mid-run
+    db.session.execute(db.update(Event).where(Event.id == booking_id).values(capacity=0))
+    db.session.commit()
+
+    def comments():
+        for i in range(scale.comments):
+            event_id = hot_id if i < scale.hot_comments else rnd.choice(open_ids)
+            yield {"user_id": rnd.choice(user_ids), "event_id": event_id,
+                   "body": " ".join(rnd.choices(WORDS, k=12)), "created_at": now - timedelta(minutes=i)}
+    _insert(Comment, comments())
+
+    _insert(Order, ({
+        "user_id": rnd.choice(user_ids), "event_id": rnd.choice(open_ids), "qty": rnd.randint(1, 4),
+        "price": Decimal("29.50"), "order_id": f"SEED-{i}",
+        "created_at": now - timedelta(minutes=rnd.randint(0, 60 * 24 * 60)),
+    } for i in range(scale.orders)))
+    # keep tickets_sold consistent with the orders just inserted
+    sold = (db.select(db.func.coalesce(db.func.sum(Order.qty), 0))
+            .where(Order.event_id == Event.id).scalar_subquery())
+    db.session.execute(db.update(Event).values(tickets_sold=sold))
+    db.session.execute(db.update(Event).where(Event.capacity != 0, Event.capacity < Event.tickets_sold)
+                       .values(capacity=Event.tickets_sold * 2))
+    db.session.commit()
+
+    rebuild_index()
+    rebuild_sales_rollup()
+    refresh_comment_counts()
+    return {
+        "scale": asdict(scale),
+        "user_names": [f"user{i}" for i in range(scale.users)],
+        "hot_event_id": hot_id,
+        "booking_event_id": booking_id,
+        "event_ids": open_ids,
+    }
@@ -0,0 +1,75 @@
+"""Login storm vs. everything else: logins/sec and home page latency during a flood,
+hashing inline on the request threads vs. in the bounded process pool.
+
+    python benchmarks/login_flood.py --seconds 10 --flooders 32
+"""
+import argparse
+import json
+import threading
+import time
+
+from common import make_app, make_user, cleanup
+from Cornerstone.passwords import hash_password
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 2)
+
+
+def run(workers, args):
+    app = make_app(PASSWORD_HASH_WORKERS=workers, BCRYPT_LOG_ROUNDS=args.rounds)
+    with app.app_context():
+        make_user("flood", password_hash=hash_password("password", inline=True))
+
+    stop = time.perf_counter() + args.seconds
+    logins = {"ok": 0, "shed": 0, "other": 0}
+    probe = []
+    lock = threading.Lock()
+
+    def flooder():
+        client = app.test_client()
+        while time.perf_counter() < stop:
+            status = client.post("/login", data={"user_name": "flood", "password": "password"}).status_code
+            with lock:
+                key = "ok" if status == 302 else "shed" if status == 503 else "other"
+                logins[key] += 1
+            client.get("/logout")
+
+    def prober():
+        client = app.test_client()
+        while time.perf_counter() < stop:
+            t = time.perf_counter()
+            client.get("/")
+            probe.append(time.perf_counter() - t)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=flooder) for _ in range(args.flooders)] + [threading.Thread(target=prober)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cleanup(app)
+
+    return {
+        "mode": "inline" if workers == 0 else f"pool ({workers or 'cpu_count'} workers)",
+        "logins_per_sec": round(logins["ok"] / args.seconds, 1),
+        "logins": logins,
+        "home_p50_ms": percentile(probe, 0.5),
+        "home_p99_ms": percentile(probe, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--flooders", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+    print(json.dumps([run(0, args), run(None, args)], indent=2))
+
+
+if __name__ == "__main__":
+    main()
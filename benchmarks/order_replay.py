@@ -0,0 +1,100 @@
+"""Double-click / retry storm: every buyer submits the same order form several
+times at once. Compares posting without a key (the old behaviour), with keys
+checked in the database only, and with the replay cache in front.
+
+Reports orders created vs. forms submitted, tickets sold, and request latency.
+
+    python benchmarks/order_replay.py --buyers 200 --repeats 5 --threads 16
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import make_app, make_event, cleanup
+from Cornerstone import db
+from Cornerstone.idempotency import new_key
+from Cornerstone.models import Event, Order, User
+
+MODES = {
+    "no_key": {},
+    "db_only": {"IDEMPOTENCY_CACHE_TTL": 0},
+    "cached": {},
+}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 2)
+
+
+def run(args, mode):
+    app = make_app(ADMISSION_CONCURRENCY=0, **MODES[mode])
+    try:
+        with app.app_context():
+            db.session.execute(db.insert(User), [
+                {"name": f"buyer{i}", "first_name": "Buyer", "last_name": str(i),
+                 "email": f"buyer{i}@example.com", "password_hash": "x"}
+                for i in range(args.buyers)
+            ])
+            db.session.commit()
+            user_ids = db.session.scalars(db.select(User.id).order_by(User.id)).all()
+            event_id = make_event(user_ids[0], capacity=0)
+
+        clients = {}
+        for uid in user_ids:
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session["_user_id"] = str(uid)
+                session["_fresh"] = True
+            clients[uid] = client
+
+        # each form is submitted `repeats` times, interleaved like a real storm
+        forms = [(uid, None if mode == "no_key" else new_key()) for uid in user_ids]
+        submissions = [form for _ in range(args.repeats) for form in forms]
+        path = f"/events/{event_id}"
+
+        def submit(form):
+            uid, key = form
+            data = {"qty": 1, "submit": "Buy Tickets"}
+            if key:
+                data["idempotency_key"] = key
+            start = time.perf_counter()
+            response = clients[uid].post(path, data=data)
+            assert response.status_code == 302, response.status_code
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            latencies = list(pool.map(submit, submissions))
+        elapsed = time.perf_counter() - start
+
+        with app.app_context():
+            orders = db.session.scalar(db.select(db.func.count(Order.id)).where(Order.event_id == event_id))
+            sold = db.session.scalar(db.select(Event.tickets_sold).where(Event.id == event_id))
+        return {
+            "mode": mode,
+            "forms": len(forms),
+            "submissions": len(submissions),
+            "orders_created": orders,
+            "tickets_sold": sold,
+            "requests_per_sec": round(len(submissions) / elapsed),
+            "latency_p50_ms": percentile(latencies, 0.50),
+            "latency_p95_ms": percentile(latencies, 0.95),
+            "latency_p99_ms": percentile(latencies, 0.99),
+        }
+    finally:
+        cleanup(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--buyers", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=5, help="submissions of each form")
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+    print(json.dumps([run(args, mode) for mode in MODES], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Organiser sales queries against a large order table: raw GROUP BY over the
+covering index vs. the daily rollup table.
+
+    python benchmarks/sales_analytics.py --orders 1000000 --events 200
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from common import make_app, make_user, make_event, cleanup
+from Cornerstone import db
+from Cornerstone.analytics import daily_sales, event_sales, rebuild_sales_rollup
+from Cornerstone.models import Order
+
+
+def seed_orders(owner_id, buyer_id, events, orders, batch=20000):
+    now = datetime.utcnow()
+    for start in range(0, orders, batch):
+        rows = [
+            {
+                "user_id": buyer_id,
+                "event_id": random.choice(events),
+                "qty": random.randint(1, 4),
+                "price": random.choice((10, 25, 49.5)),
+                "order_id": f"B{i}",
+                "created_at": now - timedelta(minutes=random.randint(0, 60 * 24 * 90)),
+            }
+            for i in range(start, min(start + batch, orders))
+        ]
+        db.session.execute(db.insert(Order), rows)
+        db.session.commit()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return result, round(samples[len(samples) // 2] * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = make_app()
+    try:
+        with app.app_context():
+            owner = make_user("organiser")
+            buyer = make_user("buyer")
+            events = [make_event(owner, f"Event {i}", capacity=0, days_ahead=30) for i in range(args.events)]
+            start = time.perf_counter()
+            seed_orders(owner, buyer, events, args.orders)
+            seed_secs = time.perf_counter() - start
+            start = time.perf_counter()
+            rollup_rows = rebuild_sales_rollup()
+            rollup_secs = time.perf_counter() - start
+
+            report = {"orders": args.orders, "events": args.events, "seed_secs": round(seed_secs, 1),
+                      "rollup_rows": rollup_rows, "rollup_rebuild_secs": round(rollup_secs, 2)}
+            results = {}
+            for mode, rollup in (("raw", False), ("rollup", True)):
+                app.config["SALES_ROLLUP"] = rollup
+                per_event, report[f"{mode}_event_sales_ms"] = timed(lambda: event_sales(owner), args.repeat)
+                per_day, report[f"{mode}_daily_sales_ms"] = timed(lambda: daily_sales(owner), args.repeat)
+                db.session.rollback()
+                results[mode] = (per_event, per_day)
+            report["results_match"] = results["raw"] == results["rollup"]
+        print(json.dumps(report, indent=2))
+    finally:
+        cleanup(app)
+
+
+if __name__ == "__main__":
+    main()
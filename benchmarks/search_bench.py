@@ -0,0 +1,86 @@
+"""Compare the old leading-wildcard ILIKE search with the fts5 index.
+
+    python benchmarks/search_bench.py --sizes 10000,100000,1000000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from common import make_app, make_user, cleanup, db
+from Cornerstone.models import Event
+from Cornerstone.search import apply_search, rebuild_index
+from sqlalchemy import or_
+
+GENRES = ("rap jazz soul funk blues night loft park festival live session groove "
+          "vinyl brass choir acoustic electric summer winter midnight underground").split()
+# a realistic catalogue has far more distinct words than genres
+_syll = ["ka", "ro", "mi", "lu", "ten", "sa", "vo", "ri", "dan", "el", "om", "tis"]
+WORDS = GENRES + sorted({a + b + c for a in _syll for b in _syll for c in _syll})
+QUERIES = ["rap", "jaz", "midnight groove", "karomi", "tenlu", "underground festival", "nomatchword"]
+
+
+def fill(owner_id, n, batch=50_000):
+    today = date.today()
+    rnd = random.Random(n)
+    conn = db.session.connection()
+    for start in range(0, n, batch):
+        rows = [{
+            "owner_id": owner_id,
+            "title": " ".join(rnd.sample(WORDS, 3)).title(),
+            "description": " ".join(rnd.choices(WORDS, k=12)),
+            "category": rnd.choice(["Rap", "Soul", "Jazz", "RnB"]),
+            "venue": rnd.choice(WORDS).title() + " Hall",
+            "artist": rnd.choice(WORDS).title(),
+            "date": today + timedelta(days=rnd.randint(-30, 365)),
+            "capacity": 100, "tickets_sold": 0, "price": 10, "cancelled": False,
+        } for _ in range(start, min(n, start + batch))]
+        # core insert skips the ORM (and its per-row index hooks); rebuild_index catches up
+        conn.execute(db.insert(Event), rows)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=24, help="rows fetched per query, like one page")
+    args = parser.parse_args()
+
+    results = []
+    for n in (int(s) for s in args.sizes.split(",")):
+        app = make_app()
+        with app.app_context():
+            owner = make_user()
+            fill(owner, n)
+            rebuild_index()
+            for q in QUERIES:
+                like = f"%{q}%"
+                ilike_stmt = (db.select(Event)
+                              .where(or_(Event.title.ilike(like), Event.venue.ilike(like), Event.artist.ilike(like)))
+                              .order_by(Event.date).limit(args.limit))
+                fts_stmt, rank = apply_search(db.select(Event), q)
+                fts_stmt = fts_stmt.order_by(*([rank] if rank is not None else []), Event.date).limit(args.limit)
+                results.append({
+                    "events": n,
+                    "query": q,
+                    "ilike_ms": round(timed(lambda: db.session.scalars(ilike_stmt).all(), args.repeat), 2),
+                    "fts_ms": round(timed(lambda: db.session.scalars(fts_stmt).all(), args.repeat), 2),
+                })
+                db.session.expunge_all()
+        cleanup(app)
+        print(json.dumps([r for r in results if r["events"] == n], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Throughput of `flask cornerstone serve` with 1, 2, 4 and 8 workers on one
+SQLite/WAL database.
+
+Seeds a dataset once, then for each worker count starts the real server as a
+subprocess and drives it over HTTP from several client processes (keep-alive
+connections, a mix of listing, detail and API reads, plus bookings with
+--write-ratio). Reports requests/s, latency percentiles and the speed-up over
+one worker. Client processes share the machine, so give them spare cores.
+
+    python benchmarks/serve_scaling.py --scale small --seconds 10 --workers 1,2,4,8
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from common import make_app, cleanup
+from dataset import PASSWORD, Scale, seed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+class Client:
+    """One keep-alive connection with its own cookies."""
+
+    def __init__(self, port):
+        self.port = port
+        self.conn = None
+        self.cookie = None
+
+    def request(self, method, path, data=None):
+        headers = {}
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # the worker was recycled or closed an idle connection: reconnect once
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        cookie = response.getheader("Set-Cookie")
+        if cookie:
+            self.cookie = cookie.split(";", 1)[0]
+        if response.getheader("Connection", "").lower() == "close":
+            self.conn.close()
+            self.conn = None
+        return response.status
+
+
+def client_process(args):
+    port, info, seconds, threads, write_ratio, seed_value = args
+    import threading
+    results = []
+
+    def run(n):
+        rnd = random.Random(seed_value * 1000 + n)
+        client = Client(port)
+        if write_ratio:
+            name = info["user_names"][(seed_value * 1000 + n) % len(info["user_names"])]
+            client.request("POST", "/login", {"user_name": name, "password": PASSWORD, "submit": "Login"})
+        reads = ["/", "/?category=Jazz", f"/events/{info['hot_event_id']}", "/api/v1/events",
+                 "/api/v1/events?category=Rap&status=Open"]
+        latencies, errors = [], 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            if write_ratio and rnd.random() < write_ratio:
+                method, path, data, ok = ("POST", f"/events/{info['booking_event_id']}",
+                                          {"qty": 1, "submit": "Buy Tickets"}, (200, 302))
+            else:
+                method, path, data, ok = "GET", rnd.choice(reads), None, (200,)
+                if path.startswith("/api/v1/events") and rnd.random() < 0.5:
+                    path = f"/api/v1/events/{rnd.choice(info['event_ids'][:200])}"
+            start = time.perf_counter()
+            try:
+                status = client.request(method, path, data)
+            except (http.client.HTTPException, OSError):
+                status = None
+            latencies.append(time.perf_counter() - start)
+            errors += status not in ok
+        results.append((latencies, errors))
+
+    pool = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return [lat for lats, _ in results for lat in lats], sum(e for _, e in results)
+
+
+def percentile(values, p):
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 2) if values else None
+
+
+def run(args, info, db_path, workers):
+    port = free_port()
+    tmp = os.path.dirname(db_path)
+    env = dict(os.environ, FLASK_APP="main",
+               CORNERSTONE_SQLALCHEMY_DATABASE_URI="sqlite:///" + db_path.replace("\\", "/"),
+               CORNERSTONE_DB_PROFILE="production", CORNERSTONE_SEED_DEMO_DATA="false",
+               CORNERSTONE_ADMISSION_DB=db_path + ".admission",
+               CORNERSTONE_WTF_CSRF_ENABLED="false", CORNERSTONE_ADMISSION_CONCURRENCY="0",
+               CORNERSTONE_MAIL_BACKEND="memory", CORNERSTONE_TEMPLATE_CACHE_DIR=os.path.join(tmp, "jinja"),
+               CORNERSTONE_SERVE_MAX_REQUESTS=str(args.max_requests))
+    proc = subprocess.Popen([sys.executable, "-m", "flask", "cornerstone", "serve", "--backend", args.backend,
+                             "--port", str(port), "--workers", str(workers)],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    try:
+        wait_until_up(port, proc)
+        # one short pass so every worker has its connections and caches warm
+        ctx = multiprocessing.get_context("fork")
+        jobs = [(port, info, args.seconds, args.threads, args.write_ratio, n) for n in range(args.clients)]
+        with ctx.Pool(args.clients) as pool:
+            pool.map(client_process, [(port, info, 1.0, args.threads, 0, n) for n in range(args.clients)])
+            started = time.perf_counter()
+            outputs = pool.map(client_process, jobs)
+            elapsed = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+    latencies = sorted(lat for lats, _ in outputs for lat in lats)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": sum(e for _, e in outputs),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--scale", choices=sorted(Scale.PRESETS), default="small")
+    parser.add_argument("--seconds", type=float, default=10.0, help="per worker count")
+    parser.add_argument("--clients", type=int, default=4, help="client processes")
+    parser.add_argument("--threads", type=int, default=8, help="connections per client process")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="share of requests that book tickets")
+    parser.add_argument("--max-requests", type=int, default=0, help="SERVE_MAX_REQUESTS for the workers")
+    parser.add_argument("--backend", choices=["auto", "gunicorn", "builtin"], default="auto")
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(prefix="cornerstone-serve-", suffix=".sqlite")
+    os.close(fd)
+    os.remove(db_path)
+    app = make_app(db_path, DB_PROFILE="production")
+    try:
+        with app.app_context():
+            info = seed(Scale.preset(args.scale))
+        results = [run(args, info, db_path, int(n)) for n in args.workers.split(",")]
+    finally:
+        cleanup(app)
+    base = results[0]["requests_per_sec"]
+    for r in results:
+        r["speedup"] = round(r["requests_per_sec"] / base, 2) if base else None
+    print(json.dumps({"cpus": os.cpu_count(), "scale": args.scale, "clients": args.clients * args.threads,
+                      "write_ratio": args.write_ratio, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
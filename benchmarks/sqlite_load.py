@@ -0,0 +1,102 @@
+"""Mixed read/booking load with and without the production sqlite profile.
+
+Reader threads fetch the home and detail pages through the test client while
+writer threads book tickets, all against one on-disk database.
+
+    python benchmarks/sqlite_load.py --seconds 10 --readers 16 --writers 8
+"""
+import argparse
+import json
+import threading
+import time
+
+from common import make_app, make_user, make_event, cleanup
+from Cornerstone.booking import reserve_tickets, CONTENDED
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 2)
+
+
+def run(profile, args):
+    app = make_app(DB_PROFILE=profile, DB_SPLIT_READS=args.split_reads and profile != "default",
+                   BOOKING_MAX_RETRIES=args.retries)
+    with app.app_context():
+        user_id = make_user()
+        event_ids = [make_event(user_id, title=f"Event {i}", capacity=10 ** 9) for i in range(20)]
+
+    stats = {"read": [], "book": []}
+    errors = {"read": 0, "book": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.seconds
+
+    def reader(n):
+        client = app.test_client()
+        i = n
+        while time.perf_counter() < stop:
+            url = "/" if i % 2 else f"/events/{event_ids[i % len(event_ids)]}"
+            t = time.perf_counter()
+            try:
+                ok = client.get(url).status_code == 200
+            except Exception:
+                ok = False
+            dt = time.perf_counter() - t
+            with lock:
+                stats["read"].append(dt)
+                errors["read"] += not ok
+            i += 1
+
+    def writer(n):
+        i = n
+        while time.perf_counter() < stop:
+            t = time.perf_counter()
+            try:
+                with app.app_context():
+                    ok = reserve_tickets(event_ids[i % 3], user_id, 1).status != CONTENDED
+            except Exception:
+                ok = False
+            dt = time.perf_counter() - t
+            with lock:
+                stats["book"].append(dt)
+                errors["book"] += not ok
+            i += 1
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cleanup(app)
+
+    report = {"profile": profile}
+    for kind in ("read", "book"):
+        n = len(stats[kind])
+        report[kind] = {
+            "ops": n,
+            "ops_per_sec": round(n / args.seconds, 1),
+            "p50_ms": percentile(stats[kind], 0.50),
+            "p99_ms": percentile(stats[kind], 0.99),
+            "error_rate": round(errors[kind] / n, 4) if n else None,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--retries", type=int, default=0,
+                        help="booking lock retries; 0 surfaces every lock error")
+    parser.add_argument("--split-reads", action="store_true", help="also route reads to a separate engine")
+    args = parser.parse_args()
+
+    print(json.dumps([run(profile, args) for profile in ("default", "production")], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+"""Route-level load test for Cornerstone.
+
+Seeds a synthetic dataset (see dataset.py), then runs each scenario for a fixed
+time with N concurrent virtual users, either in-process through the Flask test
+client or over HTTP against a real threaded WSGI server. Prints JSON with
+throughput, p50/p95/p99 latency, SQL queries per request and peak RSS per
+scenario, and optionally compares against a stored baseline.
+
+    python benchmarks/suite.py --scale small --seconds 5 --concurrency 4
+    python benchmarks/suite.py --driver wsgi --scenarios browse,search
+    python benchmarks/suite.py --save-baseline baseline.json
+    python benchmarks/suite.py --baseline baseline.json   # exit status 1 on regressions
+
+Scenarios:
+    browse       anonymous home page, category filter, next page, events.json
+    search       full-text searches from the home page
+    detail       logged-in event page with many comments (bypasses the page cache)
+    detail_anon  the same page for anonymous visitors (page cache / 304s)
+    booking      logged-in buyers booking one event concurrently
+    login        bcrypt login + logout
+    routes       every main/auth route once per iteration, reads and writes
+    api          /api/v1/events listings, filters, next page and single events
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.serving import make_server
+
+from common import make_app, cleanup, db
+from dataset import PASSWORD, Scale, seed
+
+SCENARIOS = ("browse", "search", "detail", "detail_anon", "booking", "login", "routes", "api")
+# metric -> direction that counts as worse
+REGRESSION_CHECKS = {"throughput_rps": "lower", "p95_ms": "higher", "queries_per_request": "higher"}
+
+
+class Counters:
+    """SQL statements executed by any engine, for queries-per-request."""
+
+    def __init__(self):
+        self.queries = 0
+        event.listen(Engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.queries += 1
+
+    def close(self):
+        event.remove(Engine, "before_cursor_execute", self._count)
+
+
+class ClientSession:
+    """One virtual user driving the app in-process."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.headers.get("Location", ""), response.get_data()
+
+
+class HttpSession:
+    """One virtual user talking HTTP to the server, keeping its own cookies."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.cookies = {}
+
+    def request(self, method, path, data=None):
+        headers = {"Connection": "close"}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+            for header in response.headers.get_all("Set-Cookie") or ():
+                name, _, rest = header.partition("=")
+                value = rest.split(";", 1)[0]
+                if "expires=Thu, 01 Jan 1970" in header or not value:
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = value
+            location = urlsplit(response.headers.get("Location", "")).path
+            return response.status, location, payload
+        finally:
+            conn.close()
+
+
+class Scenario:
+    """A virtual user's loop body; iteration() returns [(method, path, data, ok_statuses)]."""
+
+    needs_login = False
+
+    def __init__(self, info, n):
+        self.info = info
+        self.n = n
+        self.rnd = random.Random(n)
+
+    def user(self):
+        names = self.info["user_names"]
+        return names[self.n % len(names)]
+
+
+class Browse(Scenario):
+    def iteration(self, session):
+        status, _, body = session.request("GET", "/")
+        yield status, (200,)
+        category = self.rnd.choice(("Rap", "Soul", "Jazz", "RnB"))
+        status, _, body = session.request("GET", f"/?category={category}")
+        yield status, (200,)
+        match = re.search(rb'href="(/\?[^"]*after=[^"]+)"', body)
+        if match:
+            status, _, _ = session.request("GET", match.group(1).decode().replace("&amp;", "&"))
+            yield status, (200,)
+        status, _, _ = session.request("GET", "/events.json")
+        yield status, (200,)
+
+
+class Search(Scenario):
+    TERMS = ("rap", "jaz", "midnight groove", "festival", "underground brass", "artist 42", "nomatch")
+
+    def iteration(self, session):
+        q = self.rnd.choice(self.TERMS)
+        status, _, _ = session.request("GET", "/?" + urlencode({"q": q}))
+        yield status, (200,)
+
+
+class Detail(Scenario):
+    needs_login = True
+
+    def iteration(self, session):
+        status, _, _ = session.request("GET", f"/events/{self.info['hot_event_id']}")
+        yield status, (200,)
+
+
+class DetailAnon(Scenario):
+    def iteration(self, session):
+        status, _, _ = session.request("GET", f"/events/{self.info['hot_event_id']}")
+        yield status, (200, 304)
+
+
+class Booking(Scenario):
+    needs_login = True
+
+    def iteration(self, session):
+        status, location, _ = session.request(
+            "POST", f"/events/{self.info['booking_event_id']}", {"qty": 1, "submit": "Buy Tickets"})
+        # a redirect to /orders is a booking; back to the event is "busy, try again"
+        yield status, (302,)
+
+
+class Login(Scenario):
+    def iteration(self, session):
+        status, location, _ = session.request(
+            "POST", "/login", {"user_name": self.user(), "password": PASSWORD, "submit": "Login"})
+        yield status, (302,)
+        status, _, _ = session.request("GET", "/logout")
+        yield status, (302,)
+
+
+class Routes(Scenario):
+    needs_login = True
+    counter = itertools.count()
+
+    def iteration(self, session):
+        event_id = self.rnd.choice(self.info["event_ids"][:50])
+        reads = ["/", "/events.json", f"/events/{event_id}", "/orders", "/my-events", "/my-events/sales",
+                 "/my-events/sales.json", "/me", "/events/create", f"/events/{event_id}/queue",
+                 f"/events/{event_id}/queue.json"]
+        for path in reads:
+            status, _, _ = session.request("GET", path)
+            yield status, (200, 302)
+        status, _, _ = session.request("POST", f"/events/{event_id}", {"body": "Benchmark comment", "submit": "Post"})
+        yield status, (302,)
+        status, _, _ = session.request("POST", f"/events/{event_id}", {"qty": 1, "submit": "Buy Tickets"})
+        yield status, (302,)
+
+        form = {"title": "Benchmark Night", "artist": "Bench", "description": "Created by the suite",
+                "date": (date.today() + timedelta(days=30)).isoformat(), "venue": "Bench Hall",
+                "category": "Jazz", "image_url": "", "capacity": 100, "price": "10.00", "submit": "Post Event"}
+        status, location, _ = session.request("POST", "/events/create", form)
+        yield status, (302,)
+        new_id = location.rstrip("/").rsplit("/", 1)[-1]
+        if new_id.isdigit():
+            status, _, _ = session.request("GET", f"/events/{new_id}/edit")
+            yield status, (200,)
+            status, _, _ = session.request("POST", f"/events/{new_id}/edit", dict(form, title="Benchmark Night 2"))
+            yield status, (302,)
+            status, _, _ = session.request("POST", f"/events/{new_id}/cancel")
+            yield status, (302,)
+
+        n = next(self.counter)
+        name = f"bench{os.getpid()}x{self.n}x{n}"
+        status, _, _ = session.request("GET", "/logout")
+        yield status, (302,)
+        for path in ("/login", "/register"):
+            status, _, _ = session.request("GET", path)
+            yield status, (200,)
+        status, _, _ = session.request("POST", "/register", {
+            "first_name": "Bench", "last_name": "User", "user_name": name, "email": f"{name}@example.com",
+            "password": PASSWORD, "confirm": PASSWORD, "phone": "", "street_address": "", "submit": "Register"})
+        yield status, (302,)
+        status, _, _ = session.request(
+            "POST", "/login", {"user_name": self.user(), "password": PASSWORD, "submit": "Login"})
+        yield status, (302,)
+
+
+class Api(Scenario):
+    def iteration(self, session):
+        status, _, body = session.request("GET", "/api/v1/events")
+        yield status, (200,)
+        cursor = json.loads(body)["next"] if status == 200 else None
+        if cursor:
+            status, _, _ = session.request("GET", "/api/v1/events?" + urlencode({"after": cursor}))
+            yield status, (200,)
+        category = self.rnd.choice(("Rap", "Soul", "Jazz", "RnB"))
+        status, _, _ = session.request("GET", f"/api/v1/events?category={category}&status=Open")
+        yield status, (200,)
+        event_id = self.rnd.choice(self.info["event_ids"][:50])
+        status, _, _ = session.request("GET", f"/api/v1/events/{event_id}")
+        yield status, (200,)
+
+
+SCENARIO_CLASSES = {
+    "browse": Browse, "search": Search, "detail": Detail, "detail_anon": DetailAnon,
+    "booking": Booking, "login": Login, "routes": Routes, "api": Api,
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))] * 1000, 2)
+
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_scenario(name, info, new_session, counters, args):
+    """Drive one scenario with args.concurrency users for args.seconds; returns its stats."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    sessions = []
+    for n in range(args.concurrency):
+        scenario = SCENARIO_CLASSES[name](info, n)
+        session = new_session()
+        if scenario.needs_login:
+            session.request("POST", "/login", {"user_name": scenario.user(), "password": PASSWORD, "submit": "Login"})
+        sessions.append((scenario, session))
+
+    queries_before = counters.queries
+    deadline = time.perf_counter() + args.seconds
+
+    def user(scenario, session):
+        mine, my_errors = [], []
+        while time.perf_counter() < deadline:
+            steps = scenario.iteration(session)
+            while True:
+                start = time.perf_counter()
+                try:
+                    status, ok = next(steps)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    my_errors.append(repr(e))
+                    break
+                mine.append(time.perf_counter() - start)
+                if status not in ok:
+                    my_errors.append(status)
+        with lock:
+            latencies.extend(mine)
+            errors.extend(my_errors)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user, args=pair) for pair in sessions]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    queries = counters.queries - queries_before
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "error_samples": [str(e) for e in errors[:5]],
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "queries_per_request": round(queries / len(latencies), 2) if latencies else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """[(scenario, metric, baseline, current, change)] for metrics that got worse than tolerance."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric, worse in REGRESSION_CHECKS.items():
+            old, new = before.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (worse == "lower" and change < -tolerance) or (worse == "higher" and change > tolerance):
+                regressions.append({"scenario": name, "metric": metric, "baseline": old,
+                                    "current": new, "change": round(change, 3)})
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--driver", choices=["client", "wsgi"], default="client")
+    parser.add_argument("--seconds", type=float, default=5.0, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--scale", choices=sorted(Scale.PRESETS), default="medium")
+    for field in ("users", "events", "comments", "orders", "hot_comments"):
+        parser.add_argument("--" + field.replace("_", "-"), type=int, default=None)
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change before flagging")
+    parser.add_argument("--save-baseline", help="write the results here as the new baseline")
+    parser.add_argument("-o", "--output", help="write the JSON results here as well as stdout")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    scale = Scale.preset(args.scale, users=args.users, events=args.events, comments=args.comments,
+                         orders=args.orders, hot_comments=args.hot_comments)
+
+    app = make_app(SQLALCHEMY_ENGINE_OPTIONS={"pool_size": args.concurrency + 2, "max_overflow": 4})
+    hit = set()
+
+    @app.before_request
+    def _record_endpoint():
+        hit.add(request.endpoint)
+
+    server = None
+    try:
+        started = time.perf_counter()
+        with app.app_context():
+            info = seed(scale)
+        seed_secs = time.perf_counter() - started
+
+        if args.driver == "wsgi":
+            server = make_server("127.0.0.1", 0, app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            new_session = lambda: HttpSession("127.0.0.1", server.server_port)
+        else:
+            new_session = lambda: ClientSession(app)
+
+        counters = Counters()
+        results = {
+            "meta": {
+                "driver": args.driver, "concurrency": args.concurrency, "seconds": args.seconds,
+                "dataset": info["scale"], "seed_secs": round(seed_secs, 1),
+                "python": platform.python_version(), "platform": platform.platform(),
+                "cpus": os.cpu_count(), "revision": git_revision(),
+            },
+            "scenarios": {},
+        }
+        for name in names:
+            results["scenarios"][name] = run_scenario(name, info, new_session, counters, args)
+            print(f"{name}: {results['scenarios'][name]['throughput_rps']} req/s", file=sys.stderr)
+        counters.close()
+
+        routes = {r.endpoint for r in app.url_map.iter_rules() if r.endpoint.split(".")[0] in ("main", "auth", "api")}
+        results["meta"]["routes_not_exercised"] = sorted(routes - hit)
+    finally:
+        if server is not None:
+            server.shutdown()
+        cleanup(app)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        results["regressions"] = compare(results, baseline, args.tolerance)
+        results["baseline_revision"] = baseline.get("meta", {}).get("revision")
+        status = 1 if results["regressions"] else 0
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""On-sale spike: N buyers hit one hot event within a few seconds, with and
+without the waiting room. Reports throughput, time to sell out, buyer wait
+times and fairness (how closely booking order follows arrival order).
+
+    python benchmarks/waiting_room.py --buyers 10000 --capacity 500 --concurrency 20
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from common import make_app, make_event, cleanup
+from Cornerstone import db
+from Cornerstone.models import Event, Order, User
+
+
+def make_buyers(n):
+    db.session.execute(db.insert(User), [
+        {"name": f"buyer{i}", "first_name": "Buyer", "last_name": str(i),
+         "email": f"buyer{i}@example.com", "password_hash": "x"}
+        for i in range(n)
+    ])
+    db.session.commit()
+    return db.session.scalars(db.select(User.id).order_by(User.id)).all()
+
+
+def spearman(xs, ys):
+    n = len(xs)
+    if n < 2:
+        return None
+    rank = lambda v: {x: r for r, x in enumerate(sorted(v))}
+    rx, ry = rank(xs), rank(ys)
+    d2 = sum((rx[x] - ry[y]) ** 2 for x, y in zip(xs, ys))
+    return round(1 - 6 * d2 / (n * (n * n - 1)), 4)
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))], 3)
+
+
+class Buyer:
+    __slots__ = ("user_id", "client", "arrived", "first_seen", "booked_at", "outcome", "token", "requests")
+
+    def __init__(self, app, user_id):
+        self.user_id = user_id
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+            session["_fresh"] = True
+        self.arrived = self.first_seen = self.booked_at = self.outcome = self.token = None
+        self.requests = 0
+
+
+def check_expired_reentry(backend, path):
+    """A buyer whose admission lapsed must queue again, not crash the request."""
+    from Cornerstone.admission import MemoryRoom, SqliteRoom
+    room = MemoryRoom(2, 0.05, 30) if backend == "memory" else SqliteRoom(path, 2, 0.05, 30)
+    assert room.enter(1, 1).admitted
+    time.sleep(0.1)
+    assert room.enter(1, 1).admitted, "re-entry after the token TTL"
+
+
+def run(args, concurrency):
+    app = make_app(ADMISSION_CONCURRENCY=concurrency, ADMISSION_POLL_INTERVAL=args.poll,
+                   ADMISSION_BACKEND=args.backend, BOOKING_MAX_RETRIES=3)
+    try:
+        with app.app_context():
+            user_ids = make_buyers(args.buyers)
+            event_id = make_event(user_ids[0], "Rap Festival", capacity=args.capacity, days_ahead=30)
+        buyers = [Buyer(app, uid) for uid in user_ids]
+        detail, queue = f"/events/{event_id}", f"/events/{event_id}/queue.json"
+
+        start = time.perf_counter()
+        # (due, seq, buyer): a handful of threads drive every buyer's next request
+        schedule = [(start + random.uniform(0, args.spike), i, b) for i, b in enumerate(buyers)]
+        heapq.heapify(schedule)
+        lock = threading.Lock()
+        arrivals = iter(range(len(buyers)))
+        sold_out_at = []
+
+        def book(buyer):
+            data = {"qty": 1, "submit": "Buy Tickets"}
+            if buyer.token:
+                data["admission_token"] = buyer.token
+            response = buyer.client.post(detail, data=data)
+            location = response.headers.get("Location", "")
+            if location.endswith("/orders"):
+                buyer.outcome, buyer.booked_at = "booked", time.perf_counter()
+                return None
+            if "/queue" in location:
+                return "queued"
+            with buyer.client.session_transaction() as session:
+                message = " ".join(m for _, m in session.pop("_flashes", []))
+            if "busy" in message:
+                return "retry"
+            buyer.outcome = "sold_out"
+            return None
+
+        def step(buyer):
+            buyer.requests += 1
+            if buyer.first_seen is None:
+                buyer.first_seen = next(arrivals)
+                buyer.arrived = time.perf_counter()
+                return book(buyer)
+            if buyer.token is None:
+                state = buyer.client.get(queue).get_json()
+                if state["status"] != "Open":
+                    buyer.outcome = "sold_out"
+                    return None
+                if not state["admitted"]:
+                    return "queued"
+                buyer.token = state["token"]
+            return book(buyer)
+
+        def driver():
+            while True:
+                with lock:
+                    if not schedule:
+                        return
+                    due, seq, buyer = heapq.heappop(schedule)
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                state = step(buyer)
+                if state is None:
+                    if buyer.outcome == "sold_out" and not sold_out_at:
+                        sold_out_at.append(time.perf_counter() - start)
+                    continue
+                wait = args.poll if state == "queued" else random.uniform(0.01, 0.1)
+                with lock:
+                    heapq.heappush(schedule, (time.perf_counter() + wait, seq, buyer))
+
+        threads = [threading.Thread(target=driver) for _ in range(args.threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        with app.app_context():
+            sold = db.session.scalar(db.select(Event.tickets_sold).where(Event.id == event_id))
+            ordered = db.session.scalar(db.select(db.func.sum(Order.qty)).where(Order.event_id == event_id))
+
+        booked = sorted((b for b in buyers if b.outcome == "booked"), key=lambda b: b.booked_at)
+        waits = [b.booked_at - b.arrived for b in booked]
+        requests = sum(b.requests for b in buyers)
+        return {
+            "waiting_room": bool(concurrency),
+            "concurrency": concurrency,
+            "buyers": len(buyers),
+            "capacity": args.capacity,
+            "tickets_sold": sold,
+            "oversold": (ordered or 0) != sold or sold > args.capacity,
+            "booked": len(booked),
+            "elapsed_secs": round(elapsed, 2),
+            "first_sold_out_secs": round(sold_out_at[0], 2) if sold_out_at else None,
+            "requests": requests,
+            "requests_per_sec": round(requests / elapsed),
+            "bookings_per_sec": round(len(booked) / (booked[-1].booked_at - start), 1) if booked else 0,
+            "wait_p50_secs": percentile(waits, 0.50),
+            "wait_p95_secs": percentile(waits, 0.95),
+            "wait_max_secs": percentile(waits, 1.0),
+            # 1.0 = tickets went out exactly in arrival order
+            "fairness_spearman": spearman([b.first_seen for b in booked], list(range(len(booked)))),
+        }
+    finally:
+        cleanup(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--buyers", type=int, default=10_000)
+    parser.add_argument("--capacity", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20, help="waiting room admissions per event")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--threads", type=int, default=64, help="driver threads simulating the buyers")
+    parser.add_argument("--spike", type=float, default=5.0, help="seconds over which buyers arrive")
+    parser.add_argument("--poll", type=float, default=0.5, help="queue poll interval")
+    parser.add_argument("--no-baseline", action="store_true", help="skip the run without a waiting room")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check_expired_reentry(args.backend, os.path.join(tmp, "admission.sqlite"))
+    results = [] if args.no_baseline else [run(args, 0)]
+    results.append(run(args, args.concurrency))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,4 +3,6 @@ from Cornerstone import create_app
 
 if __name__ == '__main__':
     app = create_app()
-    app.run(debug=False)
\ No newline at end of file
+    # development server; debug follows the config (see create_app).
+    # For production use `flask --app main cornerstone serve`
+    app.run()
\ No newline at end of file